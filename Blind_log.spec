@@ -1,28 +1,21 @@
 # -*- mode: python ; coding: utf-8 -*-
 
 from PyInstaller.utils.win32.versioninfo import VSVersionInfo, FixedFileInfo, StringFileInfo, StringTable, StringStruct, VarFileInfo, VarStruct
-from PyInstaller.utils.hooks import collect_all
-
-# Собираем всё содержимое пакета transliterate
-transliterate_datas, transliterate_binaries, transliterate_hiddenimports = collect_all('transliterate')
 
 a = Analysis(
     ['main.py'],
     pathex=[],
-    binaries=transliterate_binaries,
+    binaries=[],
     datas=[
         ('help.htm', '.'),
         ('version.txt', '.'),
         ('nvdaControllerClient64.dll', '.'),
         ('changeLog.txt', '.'),
-    ] + transliterate_datas,
+    ],
     hiddenimports=[
-        'transliterate',
-        'transliterate.base',
-        'transliterate.contrib.languages.ru',
         'requests',
         'xml.etree.ElementTree',
-    ] + transliterate_hiddenimports,
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
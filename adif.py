@@ -0,0 +1,404 @@
+"""
+Потоковая работа с форматом ADIF 3.
+Поля кодируются и разбираются функциями, скомпилированными из схемы
+adif_schema (тип, проверка, длина значения в байтах кодировки файла).
+AdifWriter один раз на экспорт готовит постоянные куски записи (OPERATOR,
+теги MY_* своей станции, список видимых полей), берёт QSO из любого
+итератора и пишет в файл крупными порциями через буферизованный кодировщик,
+поэтому память не растёт с размером журнала.
+iter_adif_records читает файл порциями байт и разбирает элементы
+<TAG:длина>значение без регулярных выражений по всему файлу.
+Большие файлы read_adif_parallel отображает в память (mmap), режет на куски
+по границам <EOR> и разбирает куски в пуле процессов.
+Модуль не зависит от wx и может использоваться из скриптов.
+"""
+import mmap
+import os
+from datetime import date, datetime
+from itertools import repeat
+from operator import attrgetter
+
+from adif_schema import ADIF_VERSION, DECODERS, AdifCodec, decoder
+from qso_record import QSORecord, parse_datetime
+
+# Кодировка файлов ADIF по умолчанию
+DEFAULT_ENCODING = 'cp1251'
+# Сколько записей собирать перед одной записью в файл
+CHUNK_RECORDS = 2000
+# Размер буфера файла, байт
+BUFFER_SIZE = 1 << 20
+# Размер порции чтения при импорте, байт
+READ_CHUNK_SIZE = 1 << 20
+# Файлы не меньше этого размера импортируются параллельно, байт
+PARALLEL_IMPORT_THRESHOLD = 32 << 20
+# Размер куска файла для одного задания пула процессов, байт
+PARALLEL_CHUNK_SIZE = 8 << 20
+
+# Поля своей станции: ключ в settings.ini -> тег ADIF (порядок как в прежнем экспорте)
+STATION_FIELDS = (
+    ('operator_name', 'MY_NAME'),
+    ('my_qth', 'MY_QTH'),
+    ('my_city', 'MY_CITY'),
+    ('my_rig', 'MY_RIG'),
+    ('my_lat', 'MY_LAT'),
+    ('my_lon', 'MY_LON'),
+)
+
+# Поля QSO после даты/времени: атрибут QSORecord -> тег ADIF (выводятся, если не пустые)
+RECORD_FIELDS = (
+    ('freq', 'FREQ'),
+    ('mode', 'MODE'),
+    ('rst_sent', 'RST_SENT'),
+    ('rst_received', 'RST_RCVD'),
+    ('qth', 'GRIDSQUARE'),
+    ('band', 'BAND'),
+    ('name', 'NAME'),
+    ('city', 'QTH'),
+    ('comment', 'COMMENT'),
+)
+# Поля формы, которые экспортируются как введены, без проверки типа: в поле QTH формы
+# пишут и локатор, и просто место, и такие значения не должны пропадать из файла
+FREE_TEXT_TAGS = frozenset(['GRIDSQUARE'])
+
+# Поля общей выборки для экспорта: тег ADIF -> ключ видимости поля (visible_* в настройках)
+ROW_FIELDS = (('CALL', 'call'), ('QSO_DATE', 'date'), ('TIME_ON', 'time')) + \
+    tuple((name, attr) for attr, name in RECORD_FIELDS)
+ROW_TAGS = tuple(name for name, _ in ROW_FIELDS)
+# Позиция словаря extra (прочие поля ADIF записи или None) в выборке — последняя
+ROW_EXTRA = len(ROW_FIELDS)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_TIMES = [f"{minute // 60:02d}{minute % 60:02d}" for minute in range(1440)]
+_record_values = attrgetter(*(attr for attr, _ in RECORD_FIELDS))
+
+
+def station_from_settings(settings):
+    """Данные своей станции для заголовка записей из словаря настроек."""
+    station = {'call': settings.get('call', '')}
+    for key, _ in STATION_FIELDS:
+        station[key] = settings.get(key, '')
+    return station
+
+
+class RowExtractor:
+    """Выборка полей QSO для экспорта: кортеж строк в порядке ROW_FIELDS
+    (дата YYYYMMDD и время HHMM, как в ADIF), последним — qso.extra.
+    Делается один раз на запись, сколько бы форматов ни писалось."""
+
+    def __init__(self):
+        self._dates = {}
+
+    def _date(self, days):
+        value = self._dates.get(days)
+        if value is None:
+            value = date.fromordinal(days + _EPOCH_ORDINAL).strftime('%Y%m%d')
+            self._dates[days] = value
+        return value
+
+    def __call__(self, qso):
+        if qso.timestamp is not None:
+            days, minutes = divmod(qso.timestamp, 1440)
+            return (qso.call, self._date(days), _TIMES[minutes]) + _record_values(qso) + (qso.extra,)
+        return (qso.call, '', '') + _record_values(qso) + (qso.extra,)
+
+
+class AdifWriter:
+    def __init__(self, file, station=None, visible=None, chunk_records=CHUNK_RECORDS):
+        self.file = file
+        self.chunk_records = chunk_records
+        station = station or {}
+        visible = visible or {}
+        # Длины значений считаются в байтах кодировки файла
+        self._codec = codec = AdifCodec(getattr(file, 'encoding', None) or DEFAULT_ENCODING)
+        # Постоянные куски записи считаются один раз на экспорт
+        self._prefix = codec.encoder('OPERATOR', required=True)(station.get('call', ''))
+        self._suffix = ''.join(codec.encode(name, station[key]) for key, name in STATION_FIELDS
+                               if station.get(key)) + "<EOR>\n"
+        # (позиция в выборке, начало тега, кодировщик): CALL и видимые дата/время пишутся всегда,
+        # остальные поля — только непустые и прошедшие проверку типа. Строки без проверки
+        # (кодировщик None) кодируются прямо в format_row — так быстрее вызова функции
+        self._fields = tuple(
+            (index, f"<{name}:",
+             None if index >= 3 and (codec.kind(name) == 'string' or name in FREE_TEXT_TAGS)
+             else codec.encoder(name, required=index < 3))
+            for index, (name, key) in enumerate(ROW_FIELDS)
+            if key == 'call' or visible.get(key, True))
+        self._extract = RowExtractor()
+
+    def write_header(self, created=None):
+        created = created or datetime.now()
+        encode = self._codec.encode
+        self.file.write(f"#   Created:  {created.strftime('%d-%m-%Y  %H:%M:%S')}\n")
+        self.file.write(encode('ADIF_VER', ADIF_VERSION) + encode('PROGRAMID', 'Blind_Log') +
+                        encode('CREATED_TIMESTAMP', created.strftime('%Y%m%d %H%M%S')) + "\n<EOH>\n")
+
+    def write_footer(self):
+        pass
+
+    def format_row(self, row):
+        """Запись ADIF из готовой выборки полей (RowExtractor)."""
+        parts = [self._prefix]
+        fit = self._codec.fit
+        for index, opening, encode in self._fields:
+            value = row[index]
+            if encode is not None:
+                parts.append(encode(value))
+            elif value:
+                if value.isascii():
+                    parts.append(f"{opening}{len(value)}>{value}")
+                else:
+                    value, size = fit(value)
+                    parts.append(f"{opening}{size}>{value}")
+        extra = row[ROW_EXTRA]
+        if extra:
+            encoder = self._codec.encoder
+            for name, value in extra.items():
+                parts.append(encoder(name)(value))
+        parts.append(self._suffix)
+        return ''.join(parts)
+
+    def format_record(self, qso):
+        return self.format_row(self._extract(qso))
+
+    def write_records(self, qsos, progress=None):
+        """Пишет записи из итератора порциями; возвращает их количество.
+        progress(count) вызывается после каждой порции и может вернуть False для остановки."""
+        count = 0
+        chunk = []
+        format_record = self.format_record
+        for qso in qsos:
+            chunk.append(format_record(qso))
+            if len(chunk) >= self.chunk_records:
+                self.file.write(''.join(chunk))
+                count += len(chunk)
+                chunk = []
+                if progress is not None and progress(count) is False:
+                    return count
+        if chunk:
+            self.file.write(''.join(chunk))
+            count += len(chunk)
+        if progress is not None:
+            progress(count)
+        return count
+
+
+def export_adif(path, qsos, station=None, visible=None, encoding=DEFAULT_ENCODING, progress=None):
+    """Экспорт записей из итератора в файл ADIF; возвращает число записанных QSO."""
+    with open(path, 'w', encoding=encoding, buffering=BUFFER_SIZE) as file:
+        writer = AdifWriter(file, station=station, visible=visible)
+        writer.write_header()
+        return writer.write_records(qsos, progress=progress)
+
+
+# Обратное соответствие для импорта: тег ADIF -> поле QSO (ключ из QSO_FIELD_NAMES)
+IMPORT_FIELDS = {name: attr for attr, name in RECORD_FIELDS}
+IMPORT_FIELDS['CALL'] = 'call'
+# Теги, которые при импорте не сохраняются в extra: дата/время разбираются отдельно,
+# данные своей станции экспорт берёт из настроек
+SKIP_IMPORT_FIELDS = frozenset(['QSO_DATE', 'TIME_ON', 'OPERATOR'] + [name for _, name in STATION_FIELDS])
+
+
+def _scan_records(buf, pos, eof, record, names, encoding, stop_at=None):
+    """Разбирает элементы буфера начиная с pos и отдаёт готовые записи.
+    Возвращает (позиция, незаконченная запись): там, где буфер кончился (тег или
+    значение оборваны на границе порции, если не eof), или, если задан stop_at,
+    сразу после первого <EOR>, который заканчивается не раньше stop_at.
+    Длина значения считается в байтах, поэтому текст «<EOR>» внутри значения
+    границей записи не считается."""
+    find = buf.find
+    size = len(buf)
+    while True:
+        start = find(b'<', pos)
+        if start < 0:
+            return size, record
+        close = find(b'>', start)
+        if close < 0:
+            return (size if eof else start), record  # тег оборван на границе порции
+        colon = find(b':', start, close)
+        if colon < 0:
+            marker = buf[start + 1:close].strip().upper()
+            pos = close + 1
+            if marker == b'EOR':
+                if record:
+                    yield record
+                record = {}
+                if stop_at is not None and pos >= stop_at:
+                    return pos, record
+            elif marker == b'EOH':
+                record = {}
+            continue
+        raw_name = buf[start + 1:colon]
+        name = names.get(raw_name)
+        if name is None:
+            name = names[raw_name] = raw_name.strip().upper().decode('ascii', errors='replace')
+        # длина может сопровождаться типом данных: <TAG:5:S>
+        type_colon = find(b':', colon + 1, close)
+        try:
+            length = int(buf[colon + 1:close if type_colon < 0 else type_colon])
+        except ValueError:
+            pos = close + 1
+            continue
+        end = close + 1 + length
+        if end > size and not eof:
+            return start, record  # значение ещё не прочитано целиком
+        raw = buf[close + 1:end]
+        if encoding:
+            record[name] = raw.decode(encoding, errors='replace')
+        else:
+            try:
+                record[name] = raw.decode('utf-8')
+            except UnicodeDecodeError:
+                record[name] = raw.decode('cp1251', errors='replace')
+        pos = end
+
+
+def iter_adif_records(file, encoding=None, chunk_size=READ_CHUNK_SIZE):
+    """Генератор записей из бинарного файла ADIF: словари {ТЕГ: значение}.
+    Поля заголовка (до <EOH>) отбрасываются; длина значения считается в байтах."""
+    names = {}  # сырое имя тега -> нормализованная строка (имён в файле немного)
+    buf = b''
+    pos = 0
+    eof = False
+    record = {}
+    while True:
+        if not eof:
+            chunk = file.read(chunk_size)
+            if chunk:
+                buf = buf[pos:] + chunk
+                pos = 0
+            else:
+                eof = True
+        pos, record = yield from _scan_records(buf, pos, eof, record, names, encoding)
+        if eof:
+            break
+    if record:
+        yield record
+
+
+def _adif_datetime(qso_date, time_on):
+    """QSO_DATE (YYYYMMDD) и TIME_ON (HHMM[SS]) -> 'YYYY-MM-DD HH:MM'."""
+    if len(qso_date) < 8:
+        return ''
+    time_on = (time_on + '0000')[:4]
+    return f"{qso_date[0:4]}-{qso_date[4:6]}-{qso_date[6:8]} {time_on[0:2]}:{time_on[2:4]}"
+
+
+_decode_string = decoder('')
+# Свободный текст полей формы не проверяется и при импорте (файл мог выгрузить Blind_Log)
+_decoders_get = {**DECODERS, **{name: _decode_string for name in FREE_TEXT_TAGS}}.get
+
+
+def record_from_adif(fields):
+    """Запись ADIF -> QSORecord: значения проверяются по схеме, теги журнала раскладываются
+    по ключам QSO_FIELD_NAMES, прочие поля попадают в extra."""
+    data = {}
+    extra = {}
+    for name, value in fields.items():
+        value = _decoders_get(name, _decode_string)(value)
+        attr = IMPORT_FIELDS.get(name)
+        if attr is not None:
+            data[attr] = value
+        elif value and name not in SKIP_IMPORT_FIELDS:
+            extra[name] = value
+    get = fields.get
+    timestamp = parse_datetime(_adif_datetime(decoder('QSO_DATE')(get('QSO_DATE', '')),
+                                              decoder('TIME_ON')(get('TIME_ON', ''))))
+    return QSORecord(timestamp=timestamp, extra=extra, **data)
+
+
+def read_adif(path, encoding=None):
+    """Генератор QSORecord из файла ADIF (записи без позывного пропускаются)."""
+    with open(path, 'rb') as file:
+        for fields in iter_adif_records(file, encoding=encoding):
+            qso = record_from_adif(fields)
+            if qso.call:
+                yield qso
+
+
+def _find_any(mm, markers, start, end=None):
+    """Первое вхождение любого из вариантов маркера (регистр тегов ADIF не важен)."""
+    end = len(mm) if end is None else end
+    found = [pos for pos in (mm.find(marker, start, end) for marker in markers) if pos >= 0]
+    return min(found) if found else -1
+
+
+def split_adif_file(path, chunk_size=PARALLEL_CHUNK_SIZE):
+    """Делит файл на диапазоны байт [start, end) — предполагаемые границы кусков.
+    Конец диапазона ищется простым поиском <EOR> и может оказаться внутри значения
+    (например, <COMMENT:8>x<eor>yz); такие границы исправляет read_adif_parallel."""
+    ranges = []
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return ranges
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Первый кусок начинается с начала файла: заголовок разбирается вместе с ним
+            start = 0
+            while start < size:
+                boundary = start + chunk_size
+                if boundary >= size:
+                    ranges.append((start, size))
+                    break
+                eor = _find_any(mm, (b'<EOR>', b'<eor>', b'<Eor>'), boundary)
+                end = size if eor < 0 else eor + len(b'<EOR>')
+                ranges.append((start, end))
+                start = end
+    return ranges
+
+
+def _parse_range(path, start, end, encoding):
+    """Задание для процесса пула: разбирает записи с позиции start (она считается
+    началом записи) до первого <EOR>, который заканчивается не раньше end — при
+    ложной границе end разбор продолжается за ней. Возвращает записи кортежами
+    (их передавать между процессами дешевле объектов) и позицию, где разбор
+    остановился, — настоящую границу записи."""
+    rows = []
+
+    def add(fields):
+        qso = record_from_adif(fields)
+        if qso.call:
+            rows.append(qso.to_tuple())
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            scan = _scan_records(mm, start, True, {}, {}, encoding, stop_at=end)
+            while True:
+                try:
+                    add(next(scan))
+                except StopIteration as done:
+                    stop, fields = done.value
+                    break
+    if fields:  # последняя запись файла без <EOR>
+        add(fields)
+    return rows, stop
+
+
+def read_adif_parallel(path, workers=None, encoding=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """Генератор QSORecord из большого файла ADIF: куски разбираются в пуле процессов,
+    результаты отдаются в исходном порядке записей. Меньше чем на двух процессах
+    пул не окупается, и файл читается потоково (read_adif)."""
+    ranges = split_adif_file(path, chunk_size)
+    if not ranges:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    if workers < 2:
+        yield from read_adif(path, encoding=encoding)
+        return
+    # Пул процессов (и subprocess за ним) нужен только при импорте большого файла
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        starts = [start for start, _ in ranges]
+        ends = [end for _, end in ranges]
+        results = pool.map(_parse_range, repeat(path), starts, ends, repeat(encoding))
+        # Кусок разобран верно, только если начинается там, где закончил предыдущий
+        expected = 0
+        for (start, end), (rows, stop) in zip(ranges, results):
+            if start != expected:
+                # Граница оказалась внутри значения: предыдущий кусок прочитан дальше неё,
+                # остаток этого разбирается заново от настоящей границы
+                if expected >= end:
+                    continue
+                rows, stop = _parse_range(path, expected, end, encoding)
+            expected = stop
+            for row in rows:
+                yield QSORecord(*row)
@@ -0,0 +1,255 @@
+"""
+Схема полей ADIF 3: тип, проверка и кодирование каждого поля.
+Таблица FIELDS один раз компилируется в функции разбора (DECODERS) и, для
+каждой кодировки файла, в функции кодирования (AdifCodec), поэтому экспорт
+и импорт не ветвятся по типу поля на каждой записи, а новое поле — одна
+строка таблицы. Длина значения в теге <ТЕГ:длина> считается в байтах
+кодировки файла, как требует спецификация.
+Поля, которых нет в таблице, передаются как строки без проверки.
+Символы, которых нет в кодировке файла, транслитерируются (fit_value); если
+значение и так не записать, кодирование завершается ошибкой, а не «?».
+"""
+from datetime import date
+
+from transliterator import transliterate_russian
+
+ADIF_VERSION = '3.1.4'
+
+# Сколько готовых кодировок (и результатов разбора) значения хранить на одно поле
+# (диапазоны, режимы, даты и частоты повторяются из записи в запись)
+ENCODE_CACHE_SIZE = 4096
+
+
+def _string(value):
+    return value.strip()
+
+
+def _upper(value):
+    return value.strip().upper()
+
+
+def _lower(value):
+    return value.strip().lower()
+
+
+def _number(value):
+    value = value.strip().replace(',', '.')
+    try:
+        number = float(value)
+    except ValueError:
+        return ''
+    # nan и бесконечность числом ADIF не являются
+    return value if number == number and abs(number) != float('inf') else ''
+
+
+def _integer(low=None, high=None):
+    def normalize(value):
+        try:
+            number = int(value.strip())
+        except ValueError:
+            return ''
+        if (low is not None and number < low) or (high is not None and number > high):
+            return ''
+        return str(number)
+    return normalize
+
+
+def _date(value):
+    value = value.strip()
+    if len(value) != 8 or not value.isdigit():
+        return ''
+    try:
+        date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        return ''
+    return value
+
+
+def _time(value):
+    value = value.strip()
+    if len(value) not in (4, 6) or not value.isdigit():
+        return ''
+    if int(value[0:2]) > 23 or int(value[2:4]) > 59 or (len(value) == 6 and int(value[4:6]) > 59):
+        return ''
+    return value
+
+
+def _boolean(value):
+    value = value.strip().upper()
+    return value if value in ('Y', 'N') else ''
+
+
+def _grid(value):
+    value = value.strip().upper()
+    return value if len(value) in (2, 4, 6, 8) and value[:2].isalpha() else ''
+
+
+# Типы с небольшим набором повторяющихся значений: их готовые кодировки запоминаются
+CACHED_TYPES = frozenset(['band', 'enum', 'number', 'date', 'time', 'grid', 'boolean', 'dxcc', 'cqz', 'ituz'])
+
+# Типы данных: имя -> функция нормализации (пустая строка — значение неверно)
+TYPES = {
+    'string': _string,
+    'upper': _upper,
+    'band': _lower,
+    'enum': _upper,
+    'number': _number,
+    'date': _date,
+    'time': _time,
+    'boolean': _boolean,
+    'grid': _grid,
+    'dxcc': _integer(0, 999),
+    'cqz': _integer(1, 40),
+    'ituz': _integer(1, 90),
+    'serial': _integer(0),
+}
+
+# Поля ADIF 3: тег -> тип
+FIELDS = {
+    'CALL': 'upper',
+    'QSO_DATE': 'date',
+    'TIME_ON': 'time',
+    'QSO_DATE_OFF': 'date',
+    'TIME_OFF': 'time',
+    'FREQ': 'number',
+    'FREQ_RX': 'number',
+    'BAND': 'band',
+    'BAND_RX': 'band',
+    'MODE': 'enum',
+    'SUBMODE': 'enum',
+    'RST_SENT': 'string',
+    'RST_RCVD': 'string',
+    'NAME': 'string',
+    'QTH': 'string',
+    'GRIDSQUARE': 'grid',
+    'COMMENT': 'string',
+    'NOTES': 'string',
+    'STATE': 'enum',
+    'CNTY': 'string',
+    'COUNTRY': 'string',
+    'DXCC': 'dxcc',
+    'PFX': 'upper',
+    'CONT': 'enum',
+    'CQZ': 'cqz',
+    'ITUZ': 'ituz',
+    'IOTA': 'upper',
+    'EMAIL': 'string',
+    'SRX': 'serial',
+    'STX': 'serial',
+    'SRX_STRING': 'string',
+    'STX_STRING': 'string',
+    'CONTEST_ID': 'string',
+    'TX_PWR': 'number',
+    'RX_PWR': 'number',
+    'QSL_SENT': 'enum',
+    'QSL_RCVD': 'enum',
+    'LOTW_QSL_SENT': 'enum',
+    'LOTW_QSL_RCVD': 'enum',
+    'EQSL_QSL_SENT': 'enum',
+    'EQSL_QSL_RCVD': 'enum',
+    'CLUBLOG_QSO_UPLOAD_STATUS': 'enum',
+    'SWL': 'boolean',
+    'OPERATOR': 'upper',
+    'STATION_CALLSIGN': 'upper',
+    'MY_GRIDSQUARE': 'grid',
+    'MY_NAME': 'string',
+    'MY_CITY': 'string',
+    'MY_RIG': 'string',
+}
+
+
+def _memoized(normalize):
+    cache = {}
+
+    def decode(value):
+        result = cache.get(value)
+        if result is None:
+            result = normalize(value)
+            if len(cache) < ENCODE_CACHE_SIZE:
+                cache[value] = result
+        return result
+    return decode
+
+
+# Разбор при импорте: тег -> функция нормализации (неизвестные теги — _string)
+DECODERS = {name: _memoized(TYPES[kind]) if kind in CACHED_TYPES else TYPES[kind]
+            for name, kind in FIELDS.items()}
+
+
+def decoder(name):
+    return DECODERS.get(name, _string)
+
+
+def fit_value(value, encoding):
+    """(значение, длина в байтах) для записи в кодировке encoding. Кириллица, которой
+    нет в кодировке, транслитерируется; другие такие символы — ValueError."""
+    if value.isascii():
+        return value, len(value)
+    try:
+        return value, len(value.encode(encoding))
+    except UnicodeEncodeError:
+        pass
+    converted = transliterate_russian(value)
+    try:
+        return converted, len(converted.encode(encoding))
+    except UnicodeEncodeError as e:
+        raise ValueError(f"Значение «{value}» нельзя записать в кодировке {encoding}: "
+                         f"символ «{converted[e.start:e.end]}»") from None
+
+
+def _compile_encoder(name, normalize, encoding, required, cached):
+    opening = f"<{name}:"
+
+    def encode(value):
+        if value and normalize is not None:
+            value = normalize(value)
+        if not value:
+            return f"{opening}0>" if required else ''
+        if value.isascii():
+            return f"{opening}{len(value)}>{value}"
+        value, size = fit_value(value, encoding)
+        return f"{opening}{size}>{value}"
+    if not cached:
+        return encode
+
+    cache = {}
+
+    def encode_cached(value):
+        result = cache.get(value)
+        if result is None:
+            result = encode(value)
+            if len(cache) < ENCODE_CACHE_SIZE:
+                cache[value] = result
+        return result
+    return encode_cached
+
+
+class AdifCodec:
+    """Функции кодирования полей для одной кодировки файла; компилируются один раз на тег."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._encoders = {}
+
+    def encoder(self, name, required=False):
+        """encode(значение) -> '<ТЕГ:байты>значение' или '' для пустого/неверного значения.
+        required=True — пустое поле всё равно выводится как <ТЕГ:0>."""
+        key = (name, required)
+        encode = self._encoders.get(key)
+        if encode is None:
+            # Строки пишутся как есть: при экспорте меняется только то, что проверяется по типу
+            kind = self.kind(name)
+            normalize = None if kind == 'string' else TYPES[kind]
+            encode = self._encoders[key] = _compile_encoder(name, normalize, self.encoding, required,
+                                                            kind in CACHED_TYPES)
+        return encode
+
+    @staticmethod
+    def kind(name):
+        return FIELDS.get(name, 'string')
+
+    def fit(self, value):
+        return fit_value(value, self.encoding)
+
+    def encode(self, name, value):
+        return self.encoder(name)(value)
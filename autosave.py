@@ -0,0 +1,110 @@
+"""
+Фоновое автосохранение сеанса.
+Изменения журнала ставятся в очередь за O(1) и не ждут диска; рабочий поток
+собирает все изменения, пришедшие за окно задержки, и записывает их в temp
+одной операцией. Снимок журнала пишется во временный файл и атомарно
+подменяет temp (os.replace). При закрытии программы очередь сбрасывается
+на диск вызовом flush()/stop().
+"""
+import logging
+import threading
+import time
+
+# Окно объединения изменений по умолчанию, мс
+DEFAULT_DELAY_MS = 1000
+
+
+class AutosaveWorker:
+    def __init__(self, session_log, delay_ms=DEFAULT_DELAY_MS):
+        self.session_log = session_log
+        self.delay = max(0, delay_ms) / 1000.0
+        self._cond = threading.Condition()
+        self._pending = []      # задания: ('ops', [...]), ('snapshot', фабрика), ('clear', None)
+        self._busy = False      # рабочий поток сейчас пишет на диск
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="AutosaveWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, op, qso_id, qso=None):
+        """Ставит одну операцию журнала в очередь на запись."""
+        with self._cond:
+            if self._pending and self._pending[-1][0] == 'ops':
+                self._pending[-1][1].append((op, qso_id, qso))
+            else:
+                self._pending.append(('ops', [(op, qso_id, qso)]))
+            self._cond.notify_all()
+
+    def submit_snapshot(self, items_factory, mark=0):
+        """Ставит в очередь запись полного снимка; items_factory() вызывается в рабочем потоке
+        и возвращает пары (id, запись), mark — отметка экспорта. Снимок заменяет ещё
+        не записанные операции."""
+        with self._cond:
+            self._pending = [('snapshot', (items_factory, mark))]
+            self._cond.notify_all()
+
+    def submit_clear(self):
+        """Удаление temp; ещё не записанные изменения больше не нужны."""
+        with self._cond:
+            self._pending = [('clear', None)]
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Немедленно записывает очередь и ждёт окончания записи. Возвращает False по таймауту."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            try:
+                while self._pending or self._busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                # иначе после таймаута рабочий поток перестал бы ждать окно задержки
+                self._flush_requested = False
+        return True
+
+    def stop(self, timeout=None):
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping and not self._pending:
+                    return
+                # Ждём окно задержки, собирая все изменения в одну запись
+                deadline = time.monotonic() + self.delay
+                while not self._flush_requested and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                tasks, self._pending = self._pending, []
+                self._busy = True
+            try:
+                self._write(tasks)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, tasks):
+        for kind, payload in tasks:
+            try:
+                if kind == 'ops':
+                    self.session_log.append_many(payload, sync=True)
+                elif kind == 'snapshot':
+                    items_factory, mark = payload
+                    self.session_log.write_snapshot(items_factory(), mark)
+                elif kind == 'clear':
+                    self.session_log.clear()
+            except Exception as e:
+                logging.error(f"Ошибка автосохранения temp: {e}")
@@ -0,0 +1,126 @@
+"""
+Нагрузочная проверка поиска позывных: QRZLookup против локальной замены
+API (mock_qrz_server.py в отдельном процессе) и цепочка источников с
+прогретым кэшем. Для каждого числа параллельных потоков выводит задержку
+p50/p95/p99, пропускную способность и процессорное время на один поиск
+(только клиента: сервер работает в другом процессе).
+Запуск: python bench_qrz_lookup.py [--lookups 500] [--threads 1 4] [--latency 20]
+                                   [--jitter 10] [--error-rate 0.02] [--max-p95 мс]
+С --max-p95 скрипт завершается с кодом 1, если p95 поиска через QRZLookup
+(без учёта задержки сервера) превышает порог — для проверки перед выпуском.
+"""
+import argparse
+import contextlib
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lookup_cache import LookupCache
+from lookup_chain import DiskCache, MemoryCache, ProviderChain
+from qrz_lookup import QRZLookup
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@contextlib.contextmanager
+def mock_server(latency_ms, jitter_ms, error_rate, not_found):
+    """Запускает mock_qrz_server.py на свободном порту; отдаёт адрес API."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'mock_qrz_server.py'), '--port', '0',
+         '--latency', str(latency_ms), '--jitter', str(jitter_ms),
+         '--error-rate', str(error_rate), '--not-found', str(not_found)],
+        stdout=subprocess.PIPE, text=True, encoding='utf-8')
+    try:
+        line = process.stdout.readline()
+        yield line.split()[3]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextlib.contextmanager
+def quiet():
+    """print в пути поиска тоже стоит времени, но выводить его на экран не нужно."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def run(lookup, calls, threads):
+    """Выполняет поиск всех позывных в threads потоках; (задержки, ошибки, время, CPU)."""
+    def one(callsign):
+        started = time.perf_counter()
+        try:
+            lookup(callsign)
+            failed = False
+        except Exception:
+            failed = True
+        return time.perf_counter() - started, failed
+
+    cpu = time.process_time()
+    started = time.perf_counter()
+    with quiet(), ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one, calls))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu
+    return [latency for latency, _ in results], sum(1 for _, failed in results if failed), elapsed, cpu
+
+
+def report(title, calls, threads, latencies, errors, elapsed, cpu):
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    p50, p95, p99 = (cuts[index] * 1000 for index in (49, 94, 98))
+    print(f"{title:>14} {threads:>7} {len(calls):>8} {errors:>7} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} "
+          f"{len(calls) / elapsed:>10.0f} {cpu / len(calls) * 1e6:>11.0f}")
+    return p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lookups', type=int, default=500, help="поисков на каждый замер")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--latency', type=float, default=0, help="задержка ответа сервера, мс")
+    parser.add_argument('--jitter', type=float, default=0, help="случайная добавка к задержке, мс")
+    parser.add_argument('--error-rate', type=float, default=0, help="доля ответов с ошибкой 500")
+    parser.add_argument('--not-found', type=float, default=0.1, help="доля ненайденных позывных")
+    parser.add_argument('--max-p95', type=float, default=None,
+                        help="наибольшая допустимая p95 QRZLookup сверх задержки сервера, мс")
+    args = parser.parse_args()
+
+    calls = [f"UA{index % 10}{chr(65 + index // 10 % 26)}{chr(65 + index // 260 % 26)}{chr(65 + index % 26)}"
+             for index in range(args.lookups)]
+    print(f"{'путь':>14} {'потоков':>7} {'поисков':>8} {'ошибок':>7} {'p50, мс':>9} {'p95, мс':>9} "
+          f"{'p99, мс':>9} {'поиск/с':>10} {'CPU, мкс':>11}")
+    worst_p95 = 0.0
+    with mock_server(args.latency, args.jitter, args.error_rate, args.not_found) as url:
+        for threads in args.threads:
+            client = QRZLookup("bench", "bench", base_url=url)
+            with quiet():
+                client.lookup("UA1AAA")  # вход и первое соединение не входят в замер
+            result = run(client.lookup, calls, threads)
+            worst_p95 = max(worst_p95, report("QRZLookup", calls, threads, *result) - args.latency)
+            client.close()
+
+        # Цепочка: первый проход заполняет кэши, второй отвечает из памяти и с диска
+        client = QRZLookup("bench", "bench", base_url=url)
+        cache = LookupCache()
+        for threads in args.threads:
+            for title, memory in (("диск", False), ("память", True)):
+                providers = [(DiskCache(cache), None), (client, None)]
+                if memory:
+                    providers.insert(0, (MemoryCache(max_entries=len(calls)), None))
+                chain = ProviderChain(providers)
+                run(chain.lookup_call, calls, threads)  # прогрев кэшей
+                report(f"кэш: {title}", calls, threads, *run(chain.lookup_call, calls, threads))
+                chain.close()
+        cache.close()
+        client.close()
+
+    if args.max_p95 is not None and worst_p95 > args.max_p95:
+        print(f"p95 QRZLookup сверх задержки сервера {worst_p95:.2f} мс больше порога {args.max_p95:g} мс")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
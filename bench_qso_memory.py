@@ -0,0 +1,89 @@
+"""
+Замер памяти на одну запись QSO: словарь (как раньше в add_qso) против QSORecord.
+Запуск: python bench_qso_memory.py [--sizes 100000 1000000]
+"""
+import argparse
+import gc
+import random
+import sys
+
+from constants import BANDS, MODES
+from qso_record import QSORecord, parse_datetime
+
+NAMES = ["Ivan", "Sergey", "Aleksandr", "Nikolay", "Olga", "Dmitriy", "Pavel", "Vladimir"]
+CITIES = ["Arkhangelsk", "Moskva", "Sankt-Peterburg", "Murmansk", "Kazan", "Omsk"]
+RST = ["59", "57", "55", "599", "579"]
+
+
+def _fresh(value):
+    # Значения из полей ввода — каждый раз новые объекты строк, а не литералы
+    return "".join(list(value))
+
+
+def synthetic_fields(count, seed=1):
+    rnd = random.Random(seed)
+    for i in range(count):
+        minute = 28_000_000 + i
+        yield {
+            'call': f"R{i % 10}{chr(65 + i % 26)}{chr(65 + (i // 26) % 26)}{chr(65 + (i // 676) % 26)}",
+            'name': _fresh(rnd.choice(NAMES)),
+            'city': _fresh(rnd.choice(CITIES)),
+            'qth': f"KP{i % 90:02d}DB",
+            'band': _fresh(rnd.choice(BANDS)),
+            'mode': _fresh(rnd.choice(MODES)),
+            'rst_received': _fresh(rnd.choice(RST)),
+            'rst_sent': _fresh(rnd.choice(RST)),
+            'freq': f"{7.0 + (i % 200) / 1000:.3f}",
+            'comment': "",
+            'datetime': f"2025-{1 + minute % 12:02d}-{1 + minute % 28:02d} {minute % 24:02d}:{minute % 60:02d}",
+        }
+
+
+def deep_size(records):
+    """Размер записей вместе со значениями; общие (интернированные) объекты считаются один раз."""
+    seen = set()
+    total = 0
+    for record in records:
+        total += sys.getsizeof(record)
+        values = record.values() if isinstance(record, dict) else record.to_tuple()
+        for value in values:
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+def measure(count, build):
+    records = [build(fields) for fields in synthetic_fields(count)]
+    used = deep_size(records)
+    del records
+    gc.collect()
+    return used / count
+
+
+def build_dict(fields):
+    return dict(fields)
+
+
+def build_record(fields):
+    return QSORecord(
+        call=fields['call'], name=fields['name'], city=fields['city'], qth=fields['qth'],
+        band=fields['band'], mode=fields['mode'], rst_received=fields['rst_received'],
+        rst_sent=fields['rst_sent'], freq=fields['freq'], comment=fields['comment'],
+        timestamp=parse_datetime(fields['datetime']),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    print(f"{'записей':>10} {'dict, байт/QSO':>16} {'QSORecord, байт/QSO':>20} {'выигрыш':>8}")
+    for count in args.sizes:
+        dict_bytes = measure(count, build_dict)
+        record_bytes = measure(count, build_record)
+        print(f"{count:>10} {dict_bytes:>16.0f} {record_bytes:>20.0f} {dict_bytes / record_bytes:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Время импорта при запуске программы (python -X importtime) и проверка, что
+тяжёлые модули откладываются до первого использования: requests и разбор XML
+(поиск на QRZ.ru), updater (проверка обновлений), exporter/importer и adif
+(экспорт и импорт), webbrowser (справка), subprocess.
+Модули программы импортируются в отдельном процессе --repeat раз, берётся
+лучший результат; время wx (его не отложить) выводится отдельно и в бюджет
+не входит. Перед замером модули компилируются (compileall), чтобы не мерить
+компиляцию изменённых файлов.
+Запуск: python bench_startup.py [--module main] [--repeat 5] [--max-ms 150] [--top 15]
+Скрипт завершается с кодом 1, если время импорта без wx больше --max-ms или
+при запуске загружен отложенный модуль.
+"""
+import argparse
+import compileall
+import os
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Бюджет времени импорта модулей программы (без wx), мс
+BUDGET_MS = 150
+# Модули, которые не должны загружаться до первого использования
+DEFERRED = ("requests", "urllib3", "xml.etree.ElementTree", "xml.sax", "urllib.request", "webbrowser",
+            "subprocess", "concurrent.futures.process", "transliterate", "updater", "exporter", "importer",
+            "adif", "export_formats")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def import_times(code):
+    """Выполняет code в новом интерпретаторе с -X importtime.
+    Возвращает (записи (модуль, собственное мкс, общее мкс, родитель), stdout)."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE,
+                            capture_output=True, text=True, encoding="utf-8", errors="replace")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ошибка импорта")
+    rows = [(match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)))
+            for match in map(_LINE.match, result.stderr.splitlines()) if match]
+    # Вложенные импорты выводятся раньше того, кто их импортировал, и с большим отступом
+    entries = []
+    stack = []
+    for name, own, total, indent in reversed(rows):
+        while stack and stack[-1][1] >= indent:
+            stack.pop()
+        entries.append((name, own, total, stack[-1][0] if stack else None))
+        stack.append((name, indent))
+    entries.reverse()
+    return entries, result.stdout
+
+
+def is_wx(name):
+    return name == "wx" or name.startswith("wx.")
+
+
+def measure(module, startup):
+    """Одно измерение: (общее мкс, мкс на wx, записи, загруженные модули)."""
+    code = f"import sys\nimport {module}\nprint('\\n'.join(sys.modules))"
+    entries, stdout = import_times(code)
+    own = [entry for entry in entries if entry[3] is None and entry[0] not in startup]
+    total = sum(entry[2] for entry in own)
+    wx_total = sum(entry[2] for entry in entries if is_wx(entry[0]) and not (entry[3] and is_wx(entry[3])))
+    return total, wx_total, entries, set(stdout.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main", help="модуль, с которого начинается запуск")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=BUDGET_MS, help="бюджет импорта без wx, мс")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых долгих модулей показать")
+    args = parser.parse_args()
+
+    compileall.compile_dir(HERE, maxlevels=0, quiet=1)
+    startup = {entry[0] for entry in import_times("pass")[0]}
+    try:
+        runs = [measure(args.module, startup) for _ in range(args.repeat)]
+    except RuntimeError as e:
+        print(f"Не удалось импортировать {args.module}: {e}")
+        sys.exit(1)
+    total, wx_total, entries, loaded = min(runs, key=lambda run: run[0])
+    budget_total = (total - wx_total) / 1000
+
+    print(f"{'модуль':>32} {'своё, мс':>9} {'всего, мс':>10}")
+    heaviest = sorted((entry for entry in entries if entry[0] not in startup), key=lambda entry: -entry[2])
+    for name, own, cumulative, _ in heaviest[:args.top]:
+        print(f"{name:>32} {own / 1000:>9.1f} {cumulative / 1000:>10.1f}")
+    print(f"Импорт {args.module}: {total / 1000:.1f} мс, из них wx {wx_total / 1000:.1f} мс, "
+          f"без wx {budget_total:.1f} мс (бюджет {args.max_ms:g} мс)")
+
+    failed = False
+    early = [name for name in DEFERRED if name in loaded]
+    if early:
+        print(f"При запуске загружены отложенные модули: {', '.join(early)}")
+        failed = True
+    if budget_total > args.max_ms:
+        print(f"Время импорта без wx {budget_total:.1f} мс больше бюджета {args.max_ms:g} мс")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
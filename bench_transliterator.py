@@ -0,0 +1,91 @@
+"""
+Скорость транслитерации: прежний вариант (проверка каждого символа и
+transliterate.translit) против встроенной таблицы str.translate — без
+запоминания, с запоминанием и пакетом (transliterate_many).
+Перед замером проверяется, что результат совпадает с transliterate для
+всех символов кириллицы (U+0400–U+052F) и для набора имён и городов.
+Запуск: python bench_transliterator.py [--values 100000] [--repeat 5]
+"""
+import argparse
+import random
+import sys
+import time
+
+from transliterator import _TABLE, transliterate_many, transliterate_russian
+
+try:
+    import transliterate
+    import transliterate.contrib.languages.ru
+except ImportError:
+    transliterate = None
+
+NAMES = ["Иван", "Сергей", "Александр", "Дмитрий", "Андрей", "Николай", "Ольга", "Елена", "Пётр", "Юрий",
+         "Щукин Ёж", "Чайковский", "Эдуард", "Хабаровск", "Цурюпинск", "Подъём", "Объект", "ЩЁЧКА"]
+CITIES = ["Москва", "Санкт-Петербург", "Новосибирск", "Казань", "Самара", "Ярославль", "Тула", "Вологда"]
+LATIN = ["Ivan", "Moscow", "tnx fer QSO 73!", "RST 599", ""]
+
+
+def old_transliterate(text):
+    """transliterator.transliterate_russian до перехода на таблицу."""
+    if not text:
+        return text
+    if any(ord(char) > 127 and char.isalpha() for char in text):
+        return transliterate.translit(text, 'ru', reversed=True)
+    return text
+
+
+def check_equivalence():
+    """Список расхождений с transliterate (пустой — результаты совпадают)."""
+    samples = [chr(code) for code in range(0x0400, 0x0530)]
+    samples += NAMES + CITIES + LATIN + [" ".join(NAMES), "".join(CITIES).upper()]
+    return [(text, expected, transliterate_russian(text)) for text in samples
+            if (expected := old_transliterate(text)) != transliterate_russian(text)]
+
+
+def measure(function, values, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(values)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--values', type=int, default=100000, help="сколько значений в столбце")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if transliterate is None:
+        print("Для сравнения нужна библиотека transliterate: pip install transliterate")
+        sys.exit(1)
+    mismatches = check_equivalence()
+    for text, expected, actual in mismatches:
+        print(f"Расхождение: {text!r}: transliterate {expected!r}, таблица {actual!r}")
+    if mismatches:
+        sys.exit(1)
+    print("Результаты совпадают с transliterate")
+
+    rng = random.Random(1)
+    pool = NAMES + CITIES + LATIN
+    values = [rng.choice(pool) for _ in range(args.values)]
+    table = _TABLE
+
+    variants = [
+        ("прежний (transliterate)", lambda vs: [old_transliterate(v) for v in vs]),
+        ("таблица без запоминания", lambda vs: [v if not v or v.isascii() else v.translate(table) for v in vs]),
+        ("таблица с запоминанием", lambda vs: [transliterate_russian(v) for v in vs]),
+        ("пакет transliterate_many", transliterate_many),
+    ]
+    baseline = None
+    print(f"{'вариант':>26} {'секунд':>8} {'мкс/значение':>13} {'ускорение':>10}")
+    for title, function in variants:
+        elapsed = measure(function, values, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{title:>26} {elapsed:>8.3f} {elapsed / len(values) * 1e6:>13.2f} {baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
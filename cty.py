@@ -0,0 +1,155 @@
+"""
+Определение страны (DXCC) по позывному без интернета, по файлу cty.dat
+(формат AD1C, https://www.country-files.com).
+Префиксы файла собираются в словарь «префикс -> страна» со списком их длин,
+поэтому самый длинный подходящий префикс находится несколькими обращениями
+к словарю (микросекунды на позывной). Полные позывные из файла (записи '=')
+проверяются раньше префиксов. Уточнения зон и континента у отдельных
+префиксов — (CQ), [ITU], {континент} — учитываются. Записи, основной префикс
+которых помечен '*' (только для диплома WAE: Сицилия, Шетланды, европейская
+часть Турции...), странами DXCC не являются и пропускаются — такие позывные
+относятся к своей стране DXCC.
+"""
+import logging
+import re
+from collections import namedtuple
+
+Country = namedtuple('Country', 'name cqz ituz cont prefix')
+
+# Приписки к позывному, которые не меняют страну (/P, /QRP...)
+IGNORED_SUFFIXES = frozenset(['P', 'M', 'QRP', 'QRPP', 'A', 'B', 'LH', 'BCN', 'J'])
+# Морские и воздушные мобильные станции ни к одной стране не относятся
+NO_ENTITY_SUFFIXES = frozenset(['MM', 'AM'])
+
+_TOKEN = re.compile(r'(=?)([A-Z0-9/]+)(.*)')
+_CQZ = re.compile(r'\((\d+)\)')
+_ITUZ = re.compile(r'\[(\d+)\]')
+_CONT = re.compile(r'\{(\w+)\}')
+
+
+def _parse_token(token, country):
+    """(полный_позывной?, префикс, страна с учётом уточнений) для элемента списка префиксов."""
+    match = _TOKEN.fullmatch(token)
+    if match is None:
+        return None
+    exact, prefix, overrides = match.groups()
+    if overrides:
+        cqz = _CQZ.search(overrides)
+        ituz = _ITUZ.search(overrides)
+        cont = _CONT.search(overrides)
+        country = country._replace(
+            cqz=cqz.group(1) if cqz else country.cqz,
+            ituz=ituz.group(1) if ituz else country.ituz,
+            cont=cont.group(1) if cont else country.cont,
+        )
+    return bool(exact), prefix, country
+
+
+def parse_country_file(text):
+    """Разбирает текст cty.dat; возвращает (префиксы, полные позывные) — словари -> Country."""
+    prefixes = {}
+    exact_calls = {}
+    for record in text.split(';'):
+        parts = record.split(':')
+        if len(parts) < 9:
+            continue
+        primary = parts[7].strip()
+        if primary.startswith('*'):
+            continue  # страна только для WAE
+        try:
+            country = Country(name=' '.join(parts[0].split()), cqz=str(int(parts[1])), ituz=str(int(parts[2])),
+                              cont=parts[3].strip().upper(), prefix=primary.upper())
+        except ValueError:
+            continue  # повреждённая запись
+        for token in parts[8].upper().split(','):
+            parsed = _parse_token(token.strip(), country)
+            if parsed is None:
+                continue
+            exact, prefix, entry = parsed
+            (exact_calls if exact else prefixes)[prefix] = entry
+    return prefixes, exact_calls
+
+
+class CountryResolver:
+    def __init__(self, prefixes=None, exact_calls=None):
+        self._prefixes = prefixes or {}
+        self._exact = exact_calls or {}
+        # Длины префиксов от длинных к коротким: поиск идёт от самого длинного совпадения
+        self._lengths = sorted({len(prefix) for prefix in self._prefixes}, reverse=True)
+
+    def __len__(self):
+        return len(self._prefixes) + len(self._exact)
+
+    def _longest_prefix(self, call):
+        prefixes = self._prefixes
+        size = len(call)
+        for length in self._lengths:
+            if length <= size:
+                country = prefixes.get(call[:length])
+                if country is not None:
+                    return country
+        return None
+
+    @staticmethod
+    def _split(call):
+        """(основной позывной, префикс для поиска) с учётом приписок через '/';
+        None — станция вне стран (/MM, /AM)."""
+        parts = [part for part in call.split('/') if part]
+        if not parts:
+            return None
+        if any(part in NO_ENTITY_SUFFIXES for part in parts[1:]):
+            return None
+        # Приписки убираются в любом месте (UA1AAA/QRP/9), первая часть — всегда позывной
+        # или префикс (M/UA1AAA — Англия)
+        parts = parts[:1] + [part for part in parts[1:] if part not in IGNORED_SUFFIXES]
+        if len(parts) == 1:
+            return parts[0], parts[0]
+        first, second = parts[0], parts[1]
+        if len(second) == 1 and second.isdigit():
+            # UA1AAA/9 — другой район той же страны: UA + 9
+            for index in range(1, len(first)):
+                if first[index].isdigit():
+                    return first, first[:index] + second
+            return first, first
+        # Префикс страны пребывания — более короткая часть (DL/UA1AAA, UA1AAA/DL)
+        if len(second) < len(first):
+            return first, second
+        return second, first
+
+    def resolve(self, call):
+        """Страна (Country) по позывному или None."""
+        call = call.strip().upper()
+        if not call:
+            return None
+        country = self._exact.get(call)
+        if country is not None:
+            return country
+        if '/' not in call:
+            return self._longest_prefix(call)
+        split = self._split(call)
+        if split is None:
+            return None
+        base, prefix = split
+        if prefix == base:
+            country = self._exact.get(base)
+            if country is not None:
+                return country
+        return self._longest_prefix(prefix)
+
+    def adif_fields(self, call):
+        """Поля ADIF COUNTRY, CONT, CQZ, ITUZ для позывного (пустой словарь, если страна не найдена)."""
+        country = self.resolve(call)
+        if country is None:
+            return {}
+        return {'COUNTRY': country.name, 'CONT': country.cont, 'CQZ': country.cqz, 'ITUZ': country.ituz}
+
+
+def load_country_file(path):
+    """Читает файл cty.dat; при ошибке возвращает пустой определитель."""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            prefixes, exact_calls = parse_country_file(f.read())
+    except Exception as e:
+        logging.error(f"Ошибка чтения файла стран {path}: {e}")
+        return CountryResolver()
+    return CountryResolver(prefixes, exact_calls)
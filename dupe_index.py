@@ -0,0 +1,34 @@
+"""
+Индекс повторных связей (дублей) по ключу (позывной, диапазон, режим).
+Поддерживается инкрементально при добавлении, изменении и удалении QSO,
+поэтому проверка на повтор — один поиск в словаре при любом размере журнала.
+"""
+
+
+class DupeIndex:
+    def __init__(self):
+        # (позывной, диапазон, режим) -> число записей с таким ключом
+        self._counts = {}
+
+    @staticmethod
+    def key(call, band, mode):
+        return (call.strip().upper(), band, mode)
+
+    def __len__(self):
+        return len(self._counts)
+
+    def add(self, qso):
+        key = self.key(qso.call, qso.band, qso.mode)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def remove(self, qso):
+        key = self.key(qso.call, qso.band, qso.mode)
+        count = self._counts.get(key, 0)
+        if count > 1:
+            self._counts[key] = count - 1
+        else:
+            self._counts.pop(key, None)
+
+    def count(self, call, band, mode):
+        """Сколько раз позывной уже проведён на этом диапазоне этим режимом."""
+        return self._counts.get(self.key(call, band, mode), 0)
@@ -0,0 +1,232 @@
+"""
+Заполнение имени и города у уже записанных QSO по данным QRZ.ru.
+Журнал читается один раз, позывные без повторов ищутся параллельно
+(ограниченный пул потоков и не больше rate запросов к сервису в секунду;
+ответы из кэша ограничение не расходуют). Найденные данные пишутся в
+журнал одной транзакцией, список журнала обновляется один раз.
+Заполняются только пустые поля: то, что оператор ввёл сам, не меняется.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import wx
+import nvda_notify
+from lookup_cache import CachedLookup
+
+# Сколько позывных искать одновременно
+DEFAULT_WORKERS = 4
+# Наибольшее число запросов к QRZ.ru в секунду
+DEFAULT_RATE = 5
+# Как часто озвучивать ход работы, с
+PROGRESS_ANNOUNCE_INTERVAL = 5
+
+# Поля, которые заполняются из ответа сервиса
+ENRICH_FIELDS = ('name', 'city')
+
+
+class RateLimiter:
+    """Не больше rate вызовов wait() в секунду на все потоки (равномерно, без всплесков)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class _ThrottledProvider:
+    """Сервис поиска с ограничением частоты; считает обращения к сети и сбои."""
+
+    def __init__(self, provider, limiter):
+        self.provider = provider
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def lookup(self, callsign):
+        self.limiter.wait()
+        with self._lock:
+            self.requests += 1
+        try:
+            return self.provider.lookup(callsign)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+
+
+def collect_missing(store, until_id=None):
+    """Позывной -> id записей, у которых не заполнено имя или город."""
+    missing = {}
+    for qso_id, qso in store.iter_items(until_id=until_id):
+        if qso.call and not all(getattr(qso, field) for field in ENRICH_FIELDS):
+            missing.setdefault(qso.call.strip().upper(), []).append(qso_id)
+    return missing
+
+
+class EnrichJob:
+    """Поиск позывных в фоновом потоке; ход работы и результат передаются
+    в поток GUI через wx.CallAfter."""
+
+    def __init__(self, store, provider, cache, workers, rate, on_progress, on_done):
+        self.store = store
+        self.provider = _ThrottledProvider(provider, RateLimiter(rate))
+        # Без кэша на диске (в lookup_chain нет disk) каждый позывной ищется на сервере
+        self.lookup = CachedLookup(self.provider, cache).lookup_call if cache is not None else self.provider.lookup
+        self.workers = workers
+        self.until_id = store.last_id()
+        self.on_progress = on_progress  # on_progress(done, total) — в потоке GUI
+        self.on_done = on_done          # on_done(results, missing, stats, error) — в потоке GUI
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="QRZEnrich", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _lookup_one(self, callsign):
+        if self.cancelled.is_set():
+            return callsign, None
+        try:
+            return callsign, self.lookup(callsign)
+        except Exception:
+            return callsign, None  # сбой уже учтён в self.provider.failures
+
+    def _run(self):
+        results = {}
+        missing = {}
+        error = None
+        started = time.perf_counter()
+        try:
+            missing = collect_missing(self.store, self.until_id)
+            total = len(missing)
+            wx.CallAfter(self.on_progress, 0, total)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="QRZEnrich") as pool:
+                futures = [pool.submit(self._lookup_one, callsign) for callsign in missing]
+                for done, future in enumerate(as_completed(futures), 1):
+                    callsign, result = future.result()
+                    if result:
+                        results[callsign] = result
+                    wx.CallAfter(self.on_progress, done, total)
+                    if self.cancelled.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        break
+        except Exception as e:
+            logging.error(f"Ошибка заполнения данных из QRZ.ru: {e}")
+            error = e
+        stats = {
+            'calls': len(missing),
+            'found': len(results),
+            'requests': self.provider.requests,
+            'failures': self.provider.failures,
+            'elapsed': time.perf_counter() - started,
+        }
+        wx.CallAfter(self.on_done, results, missing, stats, error)
+
+
+class Enricher:
+    def __init__(self, qso_manager, settings_manager):
+        self.qso_manager = qso_manager
+        self.settings_manager = settings_manager
+        self.job = None  # выполняющееся заполнение
+        self._progress_dialog = None
+
+    def is_busy(self):
+        return self.job is not None
+
+    def _get_number(self, key, default):
+        try:
+            value = float(self.settings_manager.get_option(key, str(default)))
+        except (TypeError, ValueError):
+            return default
+        return value if value > 0 else default
+
+    def on_enrich(self, event):
+        """Запускает заполнение имени и города для всего журнала; возвращает True, если начато."""
+        if self.is_busy():
+            nvda_notify.nvda_notify("Заполнение данных уже выполняется")
+            return False
+        manager = self.qso_manager
+        if not manager.qrz_lookup or manager.qrz_client is None:
+            wx.MessageBox("Поиск по QRZ.ru отключён в настройках.", "Заполнение данных",
+                          wx.OK | wx.ICON_INFORMATION)
+            return False
+        if len(manager.store) == 0:
+            wx.MessageBox("Журнал пуст.", "Заполнение данных", wx.OK | wx.ICON_INFORMATION)
+            return False
+
+        self.job = EnrichJob(
+            manager.store,
+            manager.qrz_client,
+            manager.lookup_cache,
+            workers=int(self._get_number('qrz_bulk_workers', DEFAULT_WORKERS)),
+            rate=self._get_number('qrz_bulk_rate', DEFAULT_RATE),
+            on_progress=self._on_progress,
+            on_done=self._on_done,
+        )
+        self._progress_dialog = wx.ProgressDialog(
+            "Заполнение данных из QRZ.ru", "Поиск QSO без имени и города...", maximum=1, parent=None,
+            style=wx.PD_CAN_ABORT | wx.PD_AUTO_HIDE | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+        self._last_announce = time.monotonic()
+        nvda_notify.nvda_notify("Заполнение данных из QRZ.ru начато")
+        self.job.start()
+        return True
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def _on_progress(self, done, total):
+        if self.job is None or self._progress_dialog is None:
+            return
+        if self._progress_dialog.GetRange() != max(total, 1):
+            self._progress_dialog.SetRange(max(total, 1))
+        keep_going, _ = self._progress_dialog.Update(min(done, max(total, 1)),
+                                                     f"Проверено позывных: {done} из {total}")
+        if not keep_going:
+            self.job.cancel()
+            return
+        now = time.monotonic()
+        if total and now - self._last_announce >= PROGRESS_ANNOUNCE_INTERVAL:
+            self._last_announce = now
+            nvda_notify.nvda_notify(f"Заполнение данных: {done * 100 // total}%")
+
+    def _on_done(self, results, missing, stats, error):
+        cancelled = self.job.cancelled.is_set()
+        self.job = None
+        if self._progress_dialog is not None:
+            self._progress_dialog.Destroy()
+            self._progress_dialog = None
+
+        if error is not None:
+            wx.MessageBox(f"Ошибка заполнения данных из QRZ.ru: {error}", "Ошибка", wx.OK | wx.ICON_ERROR)
+            return
+        # Найденное до отмены тоже записывается: запросы уже сделаны
+        updated = self.qso_manager.enrich_qsos(
+            (qso_id, results[callsign]) for callsign, ids in missing.items() if callsign in results
+            for qso_id in ids)
+        elapsed = max(stats['elapsed'], 1e-6)
+        speed = stats['calls'] / elapsed
+        logging.info(f"Заполнение из QRZ.ru: {stats}, обновлено QSO: {updated}, {speed:.1f} позывных/с")
+        status = "прервано" if cancelled else "завершено"
+        wx.MessageBox(
+            f"Заполнение данных из QRZ.ru {status}.\n"
+            f"Позывных: {stats['calls']}, найдено: {stats['found']}, ошибок запроса: {stats['failures']}.\n"
+            f"Обновлено QSO: {updated}. Запросов к QRZ.ru: {stats['requests']}, "
+            f"время: {elapsed:.1f} с ({speed:.1f} позывных/с).",
+            "Заполнение данных", wx.OK | wx.ICON_INFORMATION)
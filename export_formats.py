@@ -0,0 +1,270 @@
+"""
+Экспорт журнала в несколько форматов за один проход.
+Поля каждой записи извлекаются один раз (adif.RowExtractor), затем готовую
+выборку получают все выбранные писатели: ADIF, ADX (XML), CSV, Cabrillo.
+Поэтому полный набор файлов для QSL и контестов стоит один обход журнала.
+Новый формат — класс с методами write_header/format_row/write_footer,
+зарегистрированный декоратором @register_writer.
+Символы, которых нет в кодировке файла, транслитерируются; если записать
+значение всё равно нельзя, экспорт завершается ошибкой, а не «?» в файле.
+"""
+import codecs
+import csv
+import io
+from datetime import datetime
+
+from adif import (AdifWriter, BUFFER_SIZE, CHUNK_RECORDS, DEFAULT_ENCODING, ROW_EXTRA, ROW_FIELDS, ROW_TAGS,
+                  STATION_FIELDS, RowExtractor)
+from adif_schema import ADIF_VERSION
+from transliterator import transliterate_russian
+
+
+def escape(value):
+    """&, < и > для текста элемента XML (как xml.sax.saxutils.escape, но без импорта
+    xml.sax, который тянет за собой urllib и почтовые модули при запуске программы)."""
+    return value.replace('&', '&amp;').replace('>', '&gt;').replace('<', '&lt;')
+
+
+def _transliterate_errors(error):
+    """Обработчик ошибок кодирования файла экспорта (open(errors=ENCODE_ERRORS))."""
+    if not isinstance(error, UnicodeEncodeError):
+        raise error
+    text = error.object[error.start:error.end]
+    replacement = transliterate_russian(text)
+    try:
+        replacement.encode(error.encoding)
+    except UnicodeEncodeError:
+        raise ValueError(f"Символ «{text}» нельзя записать в кодировке {error.encoding}") from None
+    return replacement, error.end
+
+
+ENCODE_ERRORS = 'blind_log_transliterate'
+codecs.register_error(ENCODE_ERRORS, _transliterate_errors)
+
+# Зарегистрированные форматы: идентификатор -> класс писателя (в порядке регистрации)
+WRITERS = {}
+
+PROGRAM_ID = "Blind_Log"
+
+_INDEX = {name: index for index, name in enumerate(ROW_TAGS)}
+
+
+def register_writer(cls):
+    WRITERS[cls.format_id] = cls
+    return cls
+
+
+class RowWriter:
+    """Основа писателя формата: наследник задаёт format_row(row) — текст одной записи
+    из кортежа полей в порядке ROW_FIELDS (последний элемент — словарь прочих полей
+    ADIF или None)."""
+    format_id = ''
+    title = ''
+    extension = ''
+    encoding = 'utf-8'
+    newline = None  # параметр newline для open()
+
+    def __init__(self, file, station=None, visible=None):
+        self.file = file
+        self.station = station or {}
+        self.visible = visible or {}
+
+    def columns(self):
+        """(позиция в выборке, тег) видимых полей; позывной виден всегда."""
+        return tuple((index, name) for index, (name, key) in enumerate(ROW_FIELDS)
+                     if key == 'call' or self.visible.get(key, True))
+
+    def write_header(self):
+        pass
+
+    def write_footer(self):
+        pass
+
+
+@register_writer
+class AdifFormat(AdifWriter):
+    format_id = 'adif'
+    title = 'ADIF'
+    extension = '.adi'
+    encoding = DEFAULT_ENCODING
+    newline = None
+
+
+@register_writer
+class AdxWriter(RowWriter):
+    """ADX — XML-вариант ADIF 3."""
+    format_id = 'adx'
+    title = 'ADX (XML)'
+    extension = '.adx'
+
+    def __init__(self, file, station=None, visible=None):
+        super().__init__(file, station, visible)
+        self._columns = self.columns()
+        self._operator = self._element('OPERATOR', self.station.get('call', ''))
+        self._station_part = ''.join(self._element(name, self.station[key])
+                                     for key, name in STATION_FIELDS if self.station.get(key))
+
+    @staticmethod
+    def _element(name, value):
+        return f"<{name}>{escape(value)}</{name}>"
+
+    def write_header(self):
+        created = datetime.now().strftime('%Y%m%d %H%M%S')
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n<ADX>\n<HEADER>\n'
+                        f'<ADIF_VER>{ADIF_VERSION}</ADIF_VER>\n<PROGRAMID>{PROGRAM_ID}</PROGRAMID>\n'
+                        f'<CREATED_TIMESTAMP>{created}</CREATED_TIMESTAMP>\n</HEADER>\n<RECORDS>\n')
+
+    def format_row(self, row):
+        parts = ['<RECORD>', self._operator]
+        for index, name in self._columns:
+            value = row[index]
+            if value:
+                parts.append(f"<{name}>{escape(value)}</{name}>")
+        extra = row[ROW_EXTRA]
+        if extra:
+            for name, value in extra.items():
+                parts.append(f"<{name}>{escape(value)}</{name}>")
+        parts.append(self._station_part)
+        parts.append('</RECORD>\n')
+        return ''.join(parts)
+
+    def write_footer(self):
+        self.file.write('</RECORDS>\n</ADX>\n')
+
+
+@register_writer
+class CsvWriter(RowWriter):
+    """CSV с заголовком из тегов ADIF; utf-8 с BOM, чтобы Excel узнал кодировку."""
+    format_id = 'csv'
+    title = 'CSV'
+    extension = '.csv'
+    encoding = 'utf-8-sig'
+    newline = ''
+
+    def __init__(self, file, station=None, visible=None):
+        super().__init__(file, station, visible)
+        self._columns = self.columns()
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _line(self, values):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue()
+
+    def write_header(self):
+        self.file.write(self._line([name for _, name in self._columns]))
+
+    def format_row(self, row):
+        return self._line([row[index] for index, _ in self._columns])
+
+
+@register_writer
+class CabrilloWriter(RowWriter):
+    """Cabrillo 3.0: строки QSO фиксированного состава, видимость полей не учитывается.
+    Контрольный номер (STX/SRX из extra) добавляется к RST в обмене."""
+    format_id = 'cabrillo'
+    title = 'Cabrillo'
+    extension = '.log'
+    encoding = 'ascii'
+
+    # Режим -> код режима Cabrillo
+    MODES = {'CW': 'CW', 'SSB': 'PH', 'USB': 'PH', 'LSB': 'PH', 'AM': 'PH', 'FM': 'PH', 'RTTY': 'RY'}
+    # Диапазон -> частота по умолчанию (кГц) или обозначение диапазона выше 30 МГц
+    BANDS = {
+        '160m': '1800', '80m': '3500', '40m': '7000', '30m': '10100', '20m': '14000',
+        '17m': '18068', '15m': '21000', '12m': '24890', '10m': '28000',
+        '6m': '50', '4m': '70', '2m': '144', '70cm': '432', '23cm': '1.2G',
+    }
+
+    def __init__(self, file, station=None, visible=None):
+        super().__init__(file, station, visible)
+        self._mycall = self.station.get('call', '').upper()
+        self._call, self._date, self._time, self._freq, self._mode, self._rst_sent, self._rst_rcvd, self._band = (
+            _INDEX[name] for name in ('CALL', 'QSO_DATE', 'TIME_ON', 'FREQ', 'MODE', 'RST_SENT', 'RST_RCVD', 'BAND'))
+
+    def _frequency(self, freq, band):
+        try:
+            khz = round(float(freq.replace(',', '.')) * 1000)
+        except ValueError:
+            return self.BANDS.get(band, '')
+        # Выше 30 МГц Cabrillo ожидает обозначение диапазона
+        if khz >= 30000:
+            return self.BANDS.get(band, str(khz))
+        return str(khz)
+
+    def write_header(self):
+        lines = [
+            "START-OF-LOG: 3.0",
+            f"CREATED-BY: {PROGRAM_ID}",
+            f"CALLSIGN: {self._mycall}",
+            f"OPERATORS: {self._mycall}",
+        ]
+        name = transliterate_russian(self.station.get('operator_name', ''))
+        if name:
+            lines.append(f"NAME: {name}")
+        if self.station.get('my_qth'):
+            lines.append(f"GRID-LOCATOR: {self.station['my_qth']}")
+        self.file.write('\n'.join(lines) + '\n')
+
+    def format_row(self, row):
+        qso_date = row[self._date]
+        if qso_date:
+            qso_date = f"{qso_date[0:4]}-{qso_date[4:6]}-{qso_date[6:8]}"
+        mode = row[self._mode]
+        extra = row[ROW_EXTRA] or {}
+        sent = f"{row[self._rst_sent]:<3} {extra.get('STX_STRING') or extra.get('STX', ''):<6}"
+        received = f"{row[self._rst_rcvd]:<3} {extra.get('SRX_STRING') or extra.get('SRX', ''):<6}"
+        return (f"QSO: {self._frequency(row[self._freq], row[self._band]):>5} "
+                f"{self.MODES.get(mode, 'DG' if mode else ''):<2} {qso_date:<10} {row[self._time]:<4} "
+                f"{self._mycall:<13} {sent} {row[self._call].upper():<13} {received}".rstrip() + "\n")
+
+    def write_footer(self):
+        self.file.write("END-OF-LOG:\n")
+
+
+def export_many(targets, qsos, station=None, visible=None, progress=None, chunk_records=CHUNK_RECORDS):
+    """Экспорт записей из итератора сразу в несколько файлов за один проход.
+    targets — пары (формат, путь). progress(count) вызывается после каждой порции
+    и может вернуть False для остановки. Возвращает число обработанных QSO."""
+    files = []
+    try:
+        writers = []
+        for format_id, path in targets:
+            cls = WRITERS[format_id]
+            file = open(path, 'w', encoding=cls.encoding, errors=ENCODE_ERRORS,
+                        newline=cls.newline, buffering=BUFFER_SIZE)
+            files.append(file)
+            writer = cls(file, station=station, visible=visible)
+            writer.write_header()
+            writers.append(writer)
+
+        extract = RowExtractor()
+        outputs = [(writer.format_row, writer.file.write, []) for writer in writers]
+        count = 0
+        pending = 0
+        for qso in qsos:
+            row = extract(qso)
+            for format_row, _, chunk in outputs:
+                chunk.append(format_row(row))
+            pending += 1
+            if pending >= chunk_records:
+                for _, write, chunk in outputs:
+                    write(''.join(chunk))
+                    chunk.clear()
+                count += pending
+                pending = 0
+                if progress is not None and progress(count) is False:
+                    return count
+        for _, write, chunk in outputs:
+            write(''.join(chunk))
+        count += pending
+        for writer in writers:
+            writer.write_footer()
+        if progress is not None:
+            progress(count)
+        return count
+    finally:
+        for file in files:
+            file.close()
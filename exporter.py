@@ -1,14 +1,81 @@
+import os
+import time
+import logging
+import threading
 import wx
-from datetime import datetime
+import nvda_notify
+from adif import station_from_settings
+from export_formats import WRITERS, export_many
+
+# Как часто озвучивать ход экспорта, с
+PROGRESS_ANNOUNCE_INTERVAL = 5
+
+
+class ExportJob:
+    """Экспорт в фоновом потоке сразу во все выбранные форматы (targets — пары
+    (формат, путь)). Ход работы и результат передаются в поток GUI через
+    wx.CallAfter, поэтому окно не блокируется."""
+
+    def __init__(self, targets, qsos, station, visible, on_progress, on_done):
+        self.targets = targets
+        self.qsos = qsos
+        self.station = station
+        self.visible = visible
+        self.on_progress = on_progress  # on_progress(count) — в потоке GUI
+        self.on_done = on_done          # on_done(count, error) — в потоке GUI
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="AdifExport", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _progress(self, count):
+        wx.CallAfter(self.on_progress, count)
+        return not self.cancelled.is_set()
+
+    def _run(self):
+        count = 0
+        error = None
+        try:
+            count = export_many(self.targets, self.qsos, station=self.station,
+                                visible=self.visible, progress=self._progress)
+        except Exception as e:
+            logging.error(f"Ошибка экспорта ADIF: {e}")
+            error = e
+        if error is not None or self.cancelled.is_set():
+            # Недописанные файлы не оставляем
+            for _, path in self.targets:
+                try:
+                    if os.path.exists(path):
+                        os.remove(path)
+                except OSError as e:
+                    logging.error(f"Ошибка удаления файла {path}: {e}")
+        wx.CallAfter(self.on_done, count, error)
+
 
 class Exporter:
     def __init__(self, qso_manager, settings_manager):
         self.qso_manager = qso_manager
         self.settings_manager = settings_manager
+        self.job = None  # выполняющийся экспорт
+        self._progress_dialog = None
+
+    def is_busy(self):
+        return self.job is not None
 
-    def on_export(self, event):
+    def on_export(self, event, new_only=False, on_done=None):
         parent = getattr(self.qso_manager, 'parent', None)
-        with wx.FileDialog(parent, "Сохранить файл ADIF", wildcard="ADIF files (*.adi)|*.adi",
+        if self.is_busy():
+            nvda_notify.nvda_notify("Экспорт уже выполняется")
+            return False
+        if new_only and self.qso_manager.pending_export_count() == 0:
+            wx.MessageBox("Новых QSO с момента последнего экспорта нет.", "Экспорт", wx.OK | wx.ICON_INFORMATION)
+            return False
+        title = "Сохранить новые QSO в файл ADIF" if new_only else "Сохранить файл ADIF"
+        with wx.FileDialog(parent, title, wildcard="ADIF files (*.adi)|*.adi",
                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as fileDialog:
 
             if fileDialog.ShowModal() == wx.ID_CANCEL:
@@ -16,89 +83,108 @@ class Exporter:
 
             # Получение пути для сохранения файла
             pathname = fileDialog.GetPath()
-            return self.export_to_adif(pathname)
+            return self.export_to_adif(pathname, new_only=new_only, on_done=on_done)
 
-    def export_to_adif(self, filepath):
+    def export_targets(self, filepath):
+        """ADIF в выбранный файл и дополнительные форматы, включённые в настройках,
+        рядом с ним под тем же именем."""
+        base = os.path.splitext(filepath)[0]
+        targets = [('adif', filepath)]
+        for format_id, cls in WRITERS.items():
+            if format_id != 'adif' and self.settings_manager.settings.get(f'export_{format_id}', '0') == '1':
+                targets.append((format_id, base + cls.extension))
+        return targets
+
+    def on_export_new(self, event):
+        """Экспорт только записей, добавленных после последнего экспорта."""
+        return self.on_export(event, new_only=True)
+
+    def export_to_adif(self, filepath, new_only=False, on_done=None):
+        """Запускает экспорт в фоновом потоке; возвращает True, если экспорт начат.
+        on_done(success) вызывается в потоке GUI после окончания экспорта."""
         # Убедиться, что настройки загружены
         if not hasattr(self.settings_manager, 'settings'):
             raise ValueError("Настройки не загружены в SettingsManager")
 
-        # Получение данных из настроек
-        operator = self.settings_manager.settings.get('call', '')
-        my_name = self.settings_manager.settings.get('operator_name', '')
-        my_qth = self.settings_manager.settings.get('my_qth', '')
-        my_city = self.settings_manager.settings.get('my_city', '')
-        my_rig = self.settings_manager.settings.get('my_rig', '')
-        my_lat = self.settings_manager.settings.get('my_lat', '')
-        my_lon = self.settings_manager.settings.get('my_lon', '')
+        store = self.qso_manager.store
+        # Экспортируются записи, которые были в журнале к началу экспорта;
+        # QSO, добавленные во время экспорта, попадут в следующий
+        last_id = store.last_id()
+        if new_only:
+            total = store.count_after(self.qso_manager.export_mark, last_id)
+            qsos = self.qso_manager.iter_new_qsos(until_id=last_id)
+        else:
+            total = len(store)
+            qsos = store.iter_qsos(until_id=last_id)
 
-        try:
-            with open(filepath, 'w', encoding='cp1251') as file:
-                # Запись заголовка ADIF
-                file.write(f"#   Created:  {datetime.now().strftime('%d-%m-%Y  %H:%M:%S')}\n")
-                file.write("<ADIF_VER:3>2.0\n<EOH>\n")
-
-                # Запись данных QSO — только видимые поля
-                visible = self.settings_manager.get_visible_fields()
-                for qso in self.qso_manager.qso_list:
-                    parts = []
-                    parts.append(f"<OPERATOR:{len(operator)}>{operator}")
-                    # CALL is always present
-                    parts.append(f"<CALL:{len(qso.get('call',''))}>{qso.get('call','')}")
-
-                    # Date/time handling
-                    dt_raw = qso.get('datetime', '')
-                    dt_compact = dt_raw.replace('-', '').replace(':', '').replace(' ', '')
-                    qso_date = dt_compact[:8] if len(dt_compact) >= 8 else ''
-                    qso_time = dt_compact[8:12] if len(dt_compact) > 8 else ''
-                    if visible.get('date', True):
-                        parts.append(f"<QSO_DATE:{len(qso_date)}>{qso_date}")
-                    if visible.get('time', True):
-                        parts.append(f"<TIME_ON:{len(qso_time)}>{qso_time}")
-
-                    if visible.get('freq', True) and qso.get('freq'):
-                        parts.append(f"<FREQ:{len(qso.get('freq'))}>{qso.get('freq')}")
-                    if visible.get('mode', True) and qso.get('mode'):
-                        parts.append(f"<MODE:{len(qso.get('mode'))}>{qso.get('mode')}")
-                    if visible.get('rst_sent', True) and qso.get('rst_sent'):
-                        parts.append(f"<RST_SENT:{len(qso.get('rst_sent'))}>{qso.get('rst_sent')}")
-                    if visible.get('rst_received', True) and qso.get('rst_received'):
-                        parts.append(f"<RST_RCVD:{len(qso.get('rst_received'))}>{qso.get('rst_received')}")
-                    if visible.get('qth', True) and qso.get('qth'):
-                        parts.append(f"<GRIDSQUARE:{len(qso.get('qth'))}>{qso.get('qth')}")
-                    if visible.get('band', True) and qso.get('band'):
-                        parts.append(f"<BAND:{len(qso.get('band'))}>{qso.get('band')}")
-                    if visible.get('name', True) and qso.get('name'):
-                        parts.append(f"<NAME:{len(qso.get('name'))}>{qso.get('name')}")
-                    if visible.get('city', True) and qso.get('city'):
-                        parts.append(f"<QTH:{len(qso.get('city'))}>{qso.get('city')}")
-                    if visible.get('comment', True) and qso.get('comment'):
-                        parts.append(f"<COMMENT:{len(qso.get('comment'))}>{qso.get('comment')}")
-
-                    # My station info (always include if present)
-                    if my_name:
-                        parts.append(f"<MY_NAME:{len(my_name)}>{my_name}")
-                    if my_qth:
-                        parts.append(f"<MY_QTH:{len(my_qth)}>{my_qth}")
-                    if my_city:
-                        parts.append(f"<MY_CITY:{len(my_city)}>{my_city}")
-                    if my_rig:
-                        parts.append(f"<MY_RIG:{len(my_rig)}>{my_rig}")
-                    if my_lat:
-                        parts.append(f"<MY_LAT:{len(my_lat)}>{my_lat}")
-                    if my_lon:
-                        parts.append(f"<MY_LON:{len(my_lon)}>{my_lon}")
-
-                    parts.append("<EOR>\n")
-                    file.write(''.join(parts))
-
-            wx.MessageBox("Экспорт в ADIF завершен успешно!", "Экспорт", wx.OK | wx.ICON_INFORMATION)
+        # Окно прогресса без родителя не блокирует главное окно: журнал можно вести во время экспорта
+        self._progress_dialog = wx.ProgressDialog(
+            "Экспорт в ADIF", f"Записано QSO: 0 из {total}", maximum=max(total, 1), parent=None,
+            style=wx.PD_CAN_ABORT | wx.PD_AUTO_HIDE | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+        self._total = total
+        self._last_announce = time.monotonic()
+        nvda_notify.nvda_notify(f"Экспорт начат, QSO: {total}")
+
+        targets = self.export_targets(filepath)
+
+        def done(count, error):
+            self._on_done(targets, last_id, count, error, on_done)
+
+        # Потоковая запись: записи читаются из хранилища порциями один раз на все форматы,
+        # экспортируются только видимые поля
+        self.job = ExportJob(
+            targets,
+            qsos,
+            station=station_from_settings(self.settings_manager.settings),
+            visible=self.settings_manager.get_visible_fields(),
+            on_progress=self._on_progress,
+            on_done=done,
+        )
+        self.job.start()
+        return True
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def _on_progress(self, count):
+        if self.job is None or self._progress_dialog is None:
+            return
+        total = self._total
+        keep_going, _ = self._progress_dialog.Update(min(count, max(total, 1)), f"Записано QSO: {count} из {total}")
+        if not keep_going:
+            self.job.cancel()
+            return
+        now = time.monotonic()
+        if total and now - self._last_announce >= PROGRESS_ANNOUNCE_INTERVAL:
+            self._last_announce = now
+            nvda_notify.nvda_notify(f"Экспорт: {count * 100 // total}%")
+
+    def _on_done(self, targets, last_id, count, error, on_done):
+        cancelled = self.job.cancelled.is_set()
+        self.job = None
+        if self._progress_dialog is not None:
+            self._progress_dialog.Destroy()
+            self._progress_dialog = None
+
+        success = False
+        if cancelled:
+            nvda_notify.nvda_notify("Экспорт отменён")
+        elif error is not None:
+            wx.MessageBox(f"Ошибка экспорта ADIF: {error}", "Ошибка", wx.OK | wx.ICON_ERROR)
+        else:
+            self.qso_manager.set_export_mark(last_id)
+            formats = ", ".join(WRITERS[format_id].title for format_id, _ in targets)
+            wx.MessageBox(f"Экспорт в ADIF завершен успешно! Записано QSO: {count}. Форматы: {formats}.", "Экспорт",
+                          wx.OK | wx.ICON_INFORMATION)
             try:
                 if hasattr(self.qso_manager, 'auto_temp') and self.qso_manager.auto_temp:
                     self.qso_manager.clear_temp()
+                    # QSO, добавленные во время экспорта, остаются в temp
+                    if self.qso_manager.store.last_id() != last_id:
+                        self.qso_manager.save_temp()
             except Exception:
                 pass
-            return True
-        except Exception as e:
-            wx.MessageBox(f"Ошибка экспорта ADIF: {e}", "Ошибка", wx.OK | wx.ICON_ERROR)
-            return False
\ No newline at end of file
+            success = True
+        if on_done is not None:
+            on_done(success)
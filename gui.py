@@ -1,13 +1,12 @@
-import subprocess
 import wx
 import wx.adv
-import webbrowser
 import os
+from collections import OrderedDict
 from datetime import datetime
-from updater import check_update
+import nvda_notify
 
 from qso_manager import QSOManager
-from exporter import Exporter
+from enricher import Enricher
 from settings import SettingsManager
 from utils import resource_path, get_version_info
 from constants import MODES, BANDS, DEFAULT_MODE_INDEX, DEFAULT_BAND_INDEX, JOURNAL_COLUMNS
@@ -19,6 +18,60 @@ ID_ADD_QSO = wx.NewIdRef()
 ID_EDIT_QSO = wx.NewIdRef()
 ID_DEL_QSO = wx.NewIdRef()
 ID_EXPORT_QSO = wx.NewIdRef()
+ID_IMPORT_QSO = wx.NewIdRef()
+ID_EXPORT_NEW_QSO = wx.NewIdRef()
+ID_ENRICH_QSO = wx.NewIdRef()
+ID_RESOLVE_COUNTRIES = wx.NewIdRef()
+
+
+class JournalListCtrl(wx.ListCtrl):
+    """Журнал в виртуальном режиме: текст строк запрашивается у хранилища QSO
+    только для видимых строк, поэтому обновление не зависит от размера журнала."""
+
+    # Сколько последних прочитанных записей держать в памяти для перерисовки
+    CACHE_SIZE = 256
+
+    def __init__(self, parent, qso_manager, **kwargs):
+        kwargs["style"] = kwargs.get("style", 0) | wx.LC_REPORT | wx.LC_VIRTUAL
+        super().__init__(parent, **kwargs)
+        self.qso_manager = qso_manager
+        self._cache = OrderedDict()
+
+    def OnGetItemText(self, item, column):
+        columns = getattr(self.qso_manager, 'journal_columns', [])
+        if column >= len(columns):
+            return ""
+        qso = self._get_record(item)
+        return qso.get(columns[column], '') if qso is not None else ""
+
+    def _get_record(self, item):
+        qso = self._cache.get(item)
+        if qso is not None:
+            self._cache.move_to_end(item)
+            return qso
+        store = self.qso_manager.store
+        if item >= len(store):
+            return None
+        qso = store.get_at(item)
+        self._cache[item] = qso
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return qso
+
+    def refresh_rows(self, first=0, last=None):
+        """Сообщает списку, что строки first..last (по умолчанию до конца) изменились.
+        Перерисовываются только видимые строки из этого диапазона."""
+        for index in [i for i in self._cache if i >= first and (last is None or i <= last)]:
+            del self._cache[index]
+        count = len(self.qso_manager.store)
+        if self.GetItemCount() != count:
+            self.SetItemCount(count)
+        last = count - 1 if last is None else min(last, count - 1)
+        top = self.GetTopItem()
+        first = max(first, top)
+        last = min(last, top + self.GetCountPerPage())
+        if first <= last:
+            self.RefreshItems(first, last)
 
 
 class Blind_log(wx.Frame):
@@ -30,7 +83,10 @@ class Blind_log(wx.Frame):
         self.SetTitle("Blind_Log")
         self.settings_manager = settings_manager  # Сохраняем экземпляр SettingsManager
         self.qso_manager = QSOManager(parent=self, settings_manager=self.settings_manager)  # Передаем settings_manager
-        self.exporter = Exporter(self.qso_manager, self.settings_manager)
+        # Экспорт и импорт (модули adif, export_formats) создаются при первом обращении
+        self._exporter = None
+        self._importer = None
+        self.enricher = Enricher(self.qso_manager, self.settings_manager)
         
         self._init_ui()
         self._init_journal_columns()
@@ -47,6 +103,10 @@ class Blind_log(wx.Frame):
         menubar = wx.MenuBar()
         file_menu = wx.Menu()
         file_menu.Append(wx.ID_PREFERENCES, "Настройки\tCtrl+P")
+        file_menu.Append(ID_IMPORT_QSO, "Импорт из ADIF\tCtrl+O")
+        file_menu.Append(ID_EXPORT_NEW_QSO, "Экспорт новых QSO в ADIF\tCtrl+Shift+S")
+        file_menu.Append(ID_ENRICH_QSO, "Заполнить имя и город из QRZ.ru\tCtrl+Shift+F")
+        file_menu.Append(ID_RESOLVE_COUNTRIES, "Определить страны по позывным\tCtrl+Shift+D")
         file_menu.Append(wx.ID_EXIT, "Выход\tCtrl+Q")
         menubar.Append(file_menu, "Файл")
 
@@ -81,6 +141,22 @@ class Blind_log(wx.Frame):
         self.Bind(wx.EVT_MENU, lambda e: self.qso_manager.edit_qso(e), id=ID_EDIT_QSO)
         self.Bind(wx.EVT_MENU, lambda e: self.qso_manager.del_qso(e), id=ID_DEL_QSO)
         self.Bind(wx.EVT_MENU, lambda e: self.exporter.on_export(e), id=ID_EXPORT_QSO)
+        self.Bind(wx.EVT_MENU, lambda e: self.importer.on_import(e), id=ID_IMPORT_QSO)
+        self.Bind(wx.EVT_MENU, lambda e: self.exporter.on_export_new(e), id=ID_EXPORT_NEW_QSO)
+        self.Bind(wx.EVT_MENU, lambda e: self.enricher.on_enrich(e), id=ID_ENRICH_QSO)
+        self.Bind(wx.EVT_MENU, self.on_resolve_countries, id=ID_RESOLVE_COUNTRIES)
+
+    def _add_scp_list(self, panel, main_sizer):
+        # Совпадения по фрагменту позывного (Super Check Partial)
+        scp_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        scp_label = wx.StaticText(panel, label="Совпадения:")
+        scp_list = wx.ListBox(panel, style=wx.LB_SINGLE, size=(-1, 80))
+        scp_sizer.Add(scp_label, 0, wx.ALIGN_TOP | wx.RIGHT, 5)
+        scp_sizer.Add(scp_list, 1, wx.EXPAND)
+        main_sizer.Add(scp_sizer, 0, wx.EXPAND | wx.ALL, 5)
+        scp_list.Bind(wx.EVT_LISTBOX_DCLICK, self.qso_manager.on_scp_choose)
+        scp_list.Bind(wx.EVT_KEY_DOWN, self.qso_manager.on_scp_key)
+        self.qso_manager.scp_list = scp_list
 
     def _init_add_qso_ui(self, panel):
         # Построение формы добавления QSO: создаём только видимые контролы
@@ -99,6 +175,9 @@ class Blind_log(wx.Frame):
             ('rst_sent', "RST-передано:", wx.TextCtrl, {}),
         ]
 
+        self.qso_manager.scp_list = None
+        use_scp = self.settings_manager.get_option('use_scp', '0') == '1'
+
         for key, label_text, ctrl_class, styles in field_definitions:
             if not visible.get(key, True):
                 # remove any existing control reference
@@ -112,10 +191,14 @@ class Blind_log(wx.Frame):
             row_sizer.Add(label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
             row_sizer.Add(ctrl, 1, wx.EXPAND)
             main_sizer.Add(row_sizer, 0, wx.EXPAND | wx.ALL, 5)
+            if key == 'call' and use_scp:
+                # Список создаётся сразу после поля позывного: Tab из позывного ведёт в него
+                self._add_scp_list(panel, main_sizer)
 
         # Привязка Enter для позывного
         if 'call' in self.controls:
             self.controls['call'].Bind(wx.EVT_TEXT_ENTER, self.qso_manager.on_callsign_enter)
+            self.controls['call'].Bind(wx.EVT_TEXT, self.qso_manager.on_callsign_text)
 
         # Режим
         if visible.get('mode', True):
@@ -178,9 +261,10 @@ class Blind_log(wx.Frame):
 
     def _init_journal_ui(self, panel):
         sizer = wx.BoxSizer(wx.VERTICAL)
-        self.journal_list = wx.ListCtrl(
+        self.journal_list = JournalListCtrl(
             panel,
-            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES,
+            self.qso_manager,
+            style=wx.LC_REPORT|wx.LC_VIRTUAL|wx.LC_HRULES|wx.LC_VRULES,
             size=(-1, 600)
         )
         
@@ -201,7 +285,21 @@ class Blind_log(wx.Frame):
         self.qso_manager.journal_list = self.journal_list
         self.edit_btn.Bind(wx.EVT_BUTTON, self.qso_manager.edit_qso)
         self.del_btn.Bind(wx.EVT_BUTTON, self.qso_manager.del_qso)
-        self.export_btn.Bind(wx.EVT_BUTTON, self.exporter.on_export)
+        self.export_btn.Bind(wx.EVT_BUTTON, lambda e: self.exporter.on_export(e))
+
+    @property
+    def exporter(self):
+        if self._exporter is None:
+            from exporter import Exporter
+            self._exporter = Exporter(self.qso_manager, self.settings_manager)
+        return self._exporter
+
+    @property
+    def importer(self):
+        if self._importer is None:
+            from importer import Importer
+            self._importer = Importer(self.qso_manager)
+        return self._importer
 
     def _init_journal_columns(self):
         # Перестроить колонки согласно видимости полей
@@ -253,6 +351,10 @@ class Blind_log(wx.Frame):
             (wx.ACCEL_CTRL, wx.WXK_RETURN, ID_ADD_QSO),
             (wx.ACCEL_CTRL, ord('E'), ID_EDIT_QSO),
             (wx.ACCEL_CTRL, ord('S'), ID_EXPORT_QSO),
+            (wx.ACCEL_CTRL, ord('O'), ID_IMPORT_QSO),
+            (wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord('S'), ID_EXPORT_NEW_QSO),
+            (wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord('F'), ID_ENRICH_QSO),
+            (wx.ACCEL_CTRL | wx.ACCEL_SHIFT, ord('D'), ID_RESOLVE_COUNTRIES),
             (wx.ACCEL_NORMAL, wx.WXK_DELETE, ID_DEL_QSO),
             (wx.ACCEL_SHIFT, wx.WXK_F1, wx.ID_ABOUT),
             (wx.ACCEL_NORMAL, wx.WXK_F1, wx.ID_HELP),
@@ -312,7 +414,17 @@ class Blind_log(wx.Frame):
         Обработчик закрытия окна (крестик или Alt+F4).
         Если в журнале есть хотя бы одна запись, спрашивает о сохранении.
         """
-        if len(self.qso_manager.qso_list) > 0:
+        if self._exporter is not None and self._exporter.is_busy():
+            # Хранилище нельзя закрывать, пока фоновый экспорт читает записи
+            nvda_notify.nvda_notify("Дождитесь окончания экспорта или отмените его")
+            event.Veto()
+            return
+        if self.enricher.is_busy():
+            # Найденные данные записываются в журнал по окончании поиска
+            nvda_notify.nvda_notify("Дождитесь окончания заполнения данных или отмените его")
+            event.Veto()
+            return
+        if len(self.qso_manager.store) > 0:
             dlg = wx.MessageDialog(
                 self,
                 "В журнале есть несохранённые записи. Сохранить журнал перед выходом?",
@@ -323,22 +435,43 @@ class Blind_log(wx.Frame):
             result = dlg.ShowModal()
             dlg.Destroy()
             if result == wx.ID_YES:
-                # Открыть диалог экспорта ADIF
-                export_result = self.exporter.on_export(None)
-                if export_result:
-                    self.Destroy()
-                else:
-                    # Если экспорт не удался или отменён, не закрывать окно
-                    event.Veto()
-                    return
+                # Открыть диалог экспорта ADIF; окно закроется, когда фоновый экспорт завершится успешно
+                self.exporter.on_export(None, on_done=self._on_exit_export_done)
+                # Пока экспорт идёт (или если он не начат), окно не закрываем
+                event.Veto()
+                return
             elif result == wx.ID_NO:
-                self.Destroy()
+                self._shutdown()
             else:
                 # Отмена — не закрывать окно
                 event.Veto()
                 return
         else:
-            self.Destroy()
+            self._shutdown()
+
+    def on_resolve_countries(self, event):
+        """Страна, континент и зоны CQ/ITU по файлу cty.dat для всех записей журнала."""
+        if not len(self.qso_manager.country_resolver):
+            wx.MessageBox("Файл стран cty.dat не загружен. Укажите его в настройках.", "Определение стран",
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        with wx.BusyCursor():
+            count = self.qso_manager.resolve_countries()
+        wx.MessageBox(f"Страна и зоны определены для QSO: {count}.", "Определение стран",
+                      wx.OK | wx.ICON_INFORMATION)
+
+    def _on_exit_export_done(self, success):
+        # Если экспорт не удался или отменён, окно остаётся открытым
+        if success:
+            self._shutdown()
+
+    def _shutdown(self):
+        # Дописываем очередь автосохранения на диск и закрываем хранилище журнала
+        try:
+            self.qso_manager.close()
+        except Exception:
+            pass
+        self.Destroy()
 
     def on_about(self, event):
         """
@@ -362,7 +495,7 @@ class Blind_log(wx.Frame):
 
         # Кнопка для перехода на сайт программы
         site_button = wx.Button(about_dialog, label="Перейти на сайт программы")
-        site_button.Bind(wx.EVT_BUTTON, lambda evt: webbrowser.open("https://github.com/r1oaz/Blind_Log"))
+        site_button.Bind(wx.EVT_BUTTON, lambda evt: self.open_in_browser("https://github.com/r1oaz/Blind_Log"))
         about_sizer.Add(site_button, 0, wx.ALL | wx.ALIGN_CENTER, 10)
 
         # Кнопка "Закрыть"
@@ -377,7 +510,14 @@ class Blind_log(wx.Frame):
     def on_help(self, event):
         # Открытие файла help.htm из ресурсов, упакованных в exe
         help_path = resource_path("help.htm")
-        webbrowser.open(help_path)
+        self.open_in_browser(help_path)
+
+    def open_in_browser(self, target):
+        # webbrowser загружается при первом открытии справки или сайта, а не при запуске
+        import webbrowser
+        webbrowser.open(target)
 
     def on_check_updates(self, event):
+        # updater (и requests) загружается только при проверке обновлений
+        from updater import check_update
         check_update(self)  # вызываем функцию и передаём главное окно
\ No newline at end of file
@@ -0,0 +1,43 @@
+import os
+import time
+import logging
+import wx
+from adif import read_adif, read_adif_parallel, PARALLEL_CHUNK_SIZE, PARALLEL_IMPORT_THRESHOLD
+
+class Importer:
+    def __init__(self, qso_manager):
+        self.qso_manager = qso_manager
+
+    def on_import(self, event):
+        parent = getattr(self.qso_manager, 'parent', None)
+        with wx.FileDialog(parent, "Открыть файл ADIF", wildcard="ADIF files (*.adi;*.adif)|*.adi;*.adif",
+                           style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
+
+            if fileDialog.ShowModal() == wx.ID_CANCEL:
+                return False  # Пользователь отменил импорт
+
+            pathname = fileDialog.GetPath()
+            return self.import_from_adif(pathname)
+
+    def import_from_adif(self, filepath):
+        try:
+            # Большие файлы разбираются на всех ядрах (не больше, чем кусков файла),
+            # небольшие и на одноядерной машине — потоково в одном процессе
+            size = os.path.getsize(filepath)
+            workers = min(os.cpu_count() or 1, -(-size // PARALLEL_CHUNK_SIZE))
+            parallel = size >= PARALLEL_IMPORT_THRESHOLD and workers >= 2
+            records = read_adif_parallel(filepath, workers=workers) if parallel else read_adif(filepath)
+            started = time.perf_counter()
+            with wx.BusyCursor():
+                count = self.qso_manager.import_qsos(records)
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            speed = f"{count / elapsed:.0f} QSO/с"
+            if parallel:
+                speed += f", процессов: {workers}"
+            logging.info(f"Импорт ADIF {filepath}: {count} QSO за {elapsed:.2f} с ({speed})")
+            wx.MessageBox(f"Импорт из ADIF завершен: добавлено QSO — {count} за {elapsed:.1f} с ({speed}).",
+                          "Импорт", wx.OK | wx.ICON_INFORMATION)
+            return True
+        except Exception as e:
+            wx.MessageBox(f"Ошибка импорта ADIF: {e}", "Ошибка", wx.OK | wx.ICON_ERROR)
+            return False
@@ -0,0 +1,171 @@
+"""
+Кэш результатов поиска позывных (QRZ.ru) на диске.
+Ответы хранятся в SQLite рядом с приложением, поэтому повторный поиск того же
+позывного (тот же корреспондент на другом диапазоне) не ходит в сеть и работает
+без интернета. Найденные позывные живут ttl, «не найден» — negative_ttl;
+при переполнении удаляются давно не использованные записи (LRU).
+Если сервис недоступен, отдаётся устаревшая запись из кэша.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Срок жизни найденного позывного по умолчанию, с (30 дней)
+DEFAULT_TTL = 30 * 24 * 3600
+# Срок жизни ответа «не найден», с (1 сутки)
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+# Наибольшее число позывных в кэше
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class LookupCache:
+    def __init__(self, path=":memory:", ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # found = 0 — позывной не найден (data пустая)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS lookup (call TEXT PRIMARY KEY, found INTEGER NOT NULL, "
+                          "data TEXT NOT NULL DEFAULT '', fetched REAL NOT NULL, used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_lookup_used ON lookup (used)")
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM lookup").fetchone()[0]
+        # Время последнего обращения копится в памяти и пишется в базу вместе со следующей записью
+        self._touched = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(callsign):
+        return callsign.strip().upper()
+
+    def __len__(self):
+        return self._count
+
+    def _row(self, key):
+        return self.conn.execute("SELECT found, data, fetched FROM lookup WHERE call = ?", (key,)).fetchone()
+
+    def get(self, callsign, now=None):
+        """Свежая запись кэша: (True, результат или None для «не найден») либо (False, None)."""
+        key = self._key(callsign)
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._row(key)
+            if row is None:
+                self.misses += 1
+                return False, None
+            found, data, fetched = row
+            if now - fetched > (self.ttl if found else self.negative_ttl):
+                self.misses += 1
+                return False, None
+            self._touched[key] = now
+            if found:
+                self.hits += 1
+                return True, json.loads(data)
+            self.negative_hits += 1
+            return True, None
+
+    def get_stale(self, callsign):
+        """Найденный результат из кэша без учёта срока жизни (когда сервис недоступен) или None."""
+        key = self._key(callsign)
+        with self._lock:
+            row = self._row(key)
+            if row is None or not row[0]:
+                return None
+            self.stale_hits += 1
+            self._touched[key] = time.time()
+            return json.loads(row[1])
+
+    def put(self, callsign, result, now=None):
+        """Запоминает ответ сервиса; result=None — позывной не найден."""
+        key = self._key(callsign)
+        now = time.time() if now is None else now
+        data = json.dumps(result, ensure_ascii=False) if result is not None else ''
+        with self._lock:
+            self._flush_touched()
+            exists = self._row(key) is not None
+            self.conn.execute("INSERT OR REPLACE INTO lookup (call, found, data, fetched, used) VALUES (?, ?, ?, ?, ?)",
+                              (key, 1 if result is not None else 0, data, now, now))
+            if not exists:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self.conn.commit()
+
+    def _evict(self, count):
+        self.conn.execute("DELETE FROM lookup WHERE call IN (SELECT call FROM lookup ORDER BY used LIMIT ?)", (count,))
+        self._count -= count
+        self.evictions += count
+
+    def _flush_touched(self):
+        if self._touched:
+            self.conn.executemany("UPDATE lookup SET used = ? WHERE call = ?",
+                                  [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self.conn.execute("DELETE FROM lookup")
+            self.conn.commit()
+            self._count = 0
+
+    def stats(self):
+        return {
+            'entries': self._count,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        try:
+            with self._lock:
+                self._flush_touched()
+                self.conn.commit()
+                self.conn.close()
+            logging.info(f"Кэш поиска позывных: {self.stats()}")
+        except Exception as e:
+            logging.error(f"Ошибка закрытия кэша поиска позывных: {e}")
+
+
+class CachedLookup:
+    """Поиск позывного через кэш: в сервис (provider.lookup) идут только промахи.
+    provider.lookup(callsign) возвращает словарь, None («не найден») или бросает
+    исключение, если сервис недоступен. Без устаревшей записи в кэше исключение
+    передаётся вызывающему, чтобы сбой не выдавался за «позывной не найден»."""
+
+    def __init__(self, provider, cache):
+        self.provider = provider
+        self.cache = cache
+
+    def lookup_call(self, callsign):
+        cached, result = self.cache.get(callsign)
+        if cached:
+            return result
+        try:
+            result = self.provider.lookup(callsign)
+        except Exception as e:
+            logging.error(f"Ошибка поиска позывного {callsign}: {e}")
+            # Без связи отдаём устаревшую запись, если она есть
+            stale = self.cache.get_stale(callsign)
+            if stale is None:
+                raise
+            return stale
+        self.cache.put(callsign, result)
+        return result
+
+    def close(self):
+        self.cache.close()
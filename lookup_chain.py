@@ -0,0 +1,154 @@
+"""
+Цепочка источников данных о позывном: память -> кэш на диске -> журнал -> QRZ.ru.
+Источники опрашиваются по порядку; первый ответ прекращает опрос, а более
+ранние кэши запоминают его. Ответ источника:
+  словарь {'name', 'city'} — найдено;
+  None — позывной точно не найден (ответ сервиса или сохранённый в кэше);
+  MISS — источнику нечего сказать, спросить следующий;
+  исключение — источник недоступен, спросить следующий.
+Медленным источникам задаётся свой таймаут: зависший сервис не задерживает
+ответ дольше него. Порядок задаётся строкой вида "memory,disk,journal,qrz".
+Ответы локальных источников (кэши, журнал) запоминает только память: кэш на
+диске хранит ответы QRZ.ru, и его же использует заполнение данных из QRZ.ru.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# «Нет данных» — в отличие от None («позывной не найден»)
+MISS = object()
+
+# Порядок источников по умолчанию
+DEFAULT_CHAIN = "memory,disk,journal,qrz"
+# Сколько позывных держать в памяти
+MEMORY_CACHE_SIZE = 1000
+
+
+class MemoryCache:
+    """Последние ответы в памяти (LRU): повторный Enter по тому же позывному не ходит даже на диск."""
+    name = 'memory'
+    local = True
+
+    def __init__(self, max_entries=MEMORY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, callsign):
+        with self._lock:
+            result = self._entries.get(callsign, MISS)
+            if result is not MISS:
+                self._entries.move_to_end(callsign)
+            return result
+
+    def remember(self, callsign, result):
+        with self._lock:
+            self._entries[callsign] = result
+            self._entries.move_to_end(callsign)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskCache:
+    """Кэш lookup_cache.LookupCache как звено цепочки."""
+    name = 'disk'
+    local = True
+    persistent = True  # запоминает только ответы сетевых источников
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def lookup(self, callsign):
+        cached, result = self.cache.get(callsign)
+        return result if cached else MISS
+
+    def remember(self, callsign, result):
+        self.cache.put(callsign, result)
+
+    def stale(self, callsign):
+        return self.cache.get_stale(callsign)
+
+
+class JournalLookup:
+    """Имя и город из последнего QSO с этим позывным в текущем журнале."""
+    name = 'journal'
+    local = True
+
+    def __init__(self, store):
+        self.store = store
+
+    def lookup(self, callsign):
+        for qso in reversed(self.store.find(call=callsign)):
+            if qso.name or qso.city:
+                return {"name": qso.name, "city": qso.city}
+        return MISS
+
+
+class ProviderChain:
+    """Поиск позывного по цепочке источников; интерфейс как у QRZLookup.lookup_call.
+    providers — пары (источник, таймаут в секундах или None — вызывать напрямую)."""
+
+    def __init__(self, providers):
+        self.providers = list(providers)
+        self.hits = {provider.name: 0 for provider, _ in self.providers}
+        self.failures = {provider.name: 0 for provider, _ in self.providers}
+        self._stats_lock = threading.Lock()
+        workers = sum(1 for _, timeout in self.providers if timeout is not None)
+        self._pool = ThreadPoolExecutor(max_workers=max(2, workers * 2), thread_name_prefix="LookupChain") \
+            if workers else None
+
+    def _ask(self, provider, timeout, callsign):
+        if timeout is None:
+            return provider.lookup(callsign)
+        future = self._pool.submit(provider.lookup, callsign)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise TimeoutError(f"{provider.name}: нет ответа за {timeout:g} с")
+
+    def _count(self, counter, name):
+        with self._stats_lock:
+            counter[name] += 1
+
+    def lookup_call(self, callsign):
+        callsign = callsign.strip().upper()
+        error = None
+        asked = []
+        for provider, timeout in self.providers:
+            try:
+                result = self._ask(provider, timeout, callsign)
+            except Exception as e:
+                self._count(self.failures, provider.name)
+                logging.error(f"Ошибка поиска позывного {callsign} ({provider.name}): {e}")
+                error = e
+                continue
+            if result is MISS:
+                asked.append(provider)
+                continue
+            self._count(self.hits, provider.name)
+            # Более ранние кэши запоминают ответ; данные журнала не попадают в кэш на диске
+            local = getattr(provider, 'local', False)
+            for cache in asked:
+                remember = getattr(cache, 'remember', None)
+                if remember is not None and not (local and getattr(cache, 'persistent', False)):
+                    remember(callsign, result)
+            return result
+        if error is None:
+            return None
+        # Все источники промахнулись, а сервис недоступен: устаревшая запись лучше, чем ничего
+        for provider, _ in self.providers:
+            stale = getattr(provider, 'stale', None)
+            result = stale(callsign) if stale is not None else None
+            if result is not None:
+                return result
+        raise error
+
+    def stats(self):
+        return {'hits': dict(self.hits), 'failures': dict(self.failures)}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        logging.info(f"Источники поиска позывных: {self.stats()}")
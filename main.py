@@ -4,9 +4,9 @@
 
 import wx
 import logging
+import multiprocessing
 from gui import Blind_log
 from settings import SettingsManager
-from updater import check_update
 
 class MyApp(wx.App):
     """
@@ -21,21 +21,22 @@ class MyApp(wx.App):
             # Настройка логирования теперь полностью управляется SettingsManager
             # Проверка обновлений при запуске, если включено в настройках
             if self.settings_manager.get_option('check_updates_on_start') == '1':
+                # updater тянет requests: загружаем его, только если проверка включена
+                from updater import check_update
                 check_update(None, silent_if_latest=True)  # Не показывать сообщение при автозапуске
             self.frame = Blind_log(None, settings_manager=self.settings_manager)  # Передаем settings_manager
             # автосохранение: предлагаем восстановить данные, если настройка включена
             if self.settings_manager.get_option('auto_temp', '0') == '1':
-                temp_data = self.frame.qso_manager.load_temp()
-                if temp_data and len(temp_data) > 0:
+                temp_count = self.frame.qso_manager.temp_count()
+                if temp_count > 0:
                     dlg = wx.MessageDialog(
                         self.frame,
-                        f"Найдены несохранённые данные ({len(temp_data)} QSO). Восстановить?",
+                        f"Найдены несохранённые данные ({temp_count} QSO). Восстановить?",
                         "Восстановление сессии",
                         wx.YES_NO | wx.ICON_QUESTION
                     )
                     if dlg.ShowModal() == wx.ID_YES:
-                        self.frame.qso_manager.qso_list = temp_data
-                        self.frame.qso_manager._update_journal()
+                        self.frame.qso_manager.restore_temp()
                         # после восстановления больше не предлагать
                         try:
                             self.frame.qso_manager.clear_temp()
@@ -53,5 +54,7 @@ class MyApp(wx.App):
             return False
 
 if __name__ == "__main__":
+    # Нужно для пула процессов импорта ADIF в собранном PyInstaller exe
+    multiprocessing.freeze_support()
     app = MyApp()
     app.MainLoop()
\ No newline at end of file
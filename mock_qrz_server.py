@@ -0,0 +1,151 @@
+"""
+Локальная замена XML API QRZ.ru (login и callsign) для проверки поиска без сети.
+Запуск:  python mock_qrz_server.py --port 8090 --latency 50
+затем в settings.ini:  qrz_api_url = http://127.0.0.1:8090/
+Данные позывных вымышленные, но постоянные (зависят только от позывного);
+часть позывных «не найдена» (--not-found), сессия истекает через --session-ttl
+секунд, чтобы проверить повторный вход. Задержка ответа (--latency, --jitter)
+имитирует медленную сеть, --error-rate — долю ответов «500 Internal Server Error».
+Сервер многопоточный.
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+NAMES = ["Ivan", "Sergey", "Alexander", "Dmitry", "Andrey", "Nikolay", "Olga", "Elena", "Pavel", "Yuri"]
+CITIES = ["Moscow", "Saint Petersburg", "Novosibirsk", "Kazan", "Samara", "Omsk", "Perm", "Tula", "Vologda"]
+
+_HEAD = '<?xml version="1.0" encoding="utf-8" ?>\n<QRZDatabase version="1.36" xmlns="http://api.qrz.ru">\n'
+_TAIL = '</QRZDatabase>\n'
+
+
+class MockQRZ:
+    """Состояние сервера: сессии, параметры ответов и счётчики запросов."""
+
+    def __init__(self, username="", password="", latency=0.0, jitter=0.0, not_found=0.1, session_ttl=3600,
+                 error_rate=0.0):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.not_found = not_found
+        self.session_ttl = session_ttl
+        self.error_rate = error_rate
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.logins = 0
+        self.lookups = 0
+        self.errors = 0
+
+    def fail(self):
+        """Отвечать ли на этот запрос ошибкой сервера (доля error_rate)."""
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return True
+        return False
+
+    def _delay(self):
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def login(self, params):
+        self._delay()
+        if self.username and (params.get('u') != self.username or params.get('p') != self.password):
+            return f"{_HEAD}<Session><error>Username/password incorrect</error></Session>\n{_TAIL}"
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self.logins += 1
+            self._sessions[session_id] = time.monotonic() + self.session_ttl
+        return f"{_HEAD}<Session><session_id>{session_id}</session_id></Session>\n{_TAIL}"
+
+    def callsign(self, params):
+        self._delay()
+        with self._lock:
+            self.lookups += 1
+            expires = self._sessions.get(params.get('id', ''))
+        if expires is None or expires < time.monotonic():
+            return f"{_HEAD}<Session><error>Session does not exist or expired</error></Session>\n{_TAIL}"
+        call = params.get('callsign', '').strip().upper()
+        seed = zlib.crc32(call.encode('utf-8'))
+        if not call or (seed % 1000) < self.not_found * 1000:
+            return f"{_HEAD}<Session><error>Callsign {escape(call)} not found</error></Session>\n{_TAIL}"
+        return (f"{_HEAD}<Callsign><call>{escape(call)}</call><name>{NAMES[seed % len(NAMES)]}</name>"
+                f"<city>{CITIES[(seed // 7) % len(CITIES)]}</city></Callsign>\n{_TAIL}")
+
+
+def make_server(host="127.0.0.1", port=0, **options):
+    """HTTP-сервер с заменой API (port=0 — свободный порт); состояние — server.qrz.
+    Запуск в фоне: threading.Thread(target=server.serve_forever, daemon=True).start()."""
+    qrz = MockQRZ(**options)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, как у настоящего сервера
+        # заголовки и тело уходят разными send(): без TCP_NODELAY ответ ждёт отложенный ACK клиента (~40 мс)
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            endpoint = url.path.strip('/')
+            if endpoint == 'callsign' and qrz.fail():
+                self.send_error(500)
+                return
+            if endpoint == 'login':
+                body = qrz.login(params)
+            elif endpoint == 'callsign':
+                body = qrz.callsign(params)
+            else:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.qrz = qrz
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная замена XML API QRZ.ru")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0, help="случайная добавка к задержке, мс")
+    parser.add_argument("--not-found", type=float, default=0.1, help="доля ненайденных позывных (0..1)")
+    parser.add_argument("--session-ttl", type=float, default=3600, help="срок жизни сессии, с")
+    parser.add_argument("--error-rate", type=float, default=0, help="доля ответов с ошибкой 500 (0..1)")
+    parser.add_argument("--username", default="", help="требуемый логин (пусто — любой)")
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, username=args.username, password=args.password,
+                         latency=args.latency / 1000, jitter=args.jitter / 1000,
+                         not_found=args.not_found, session_ttl=args.session_ttl, error_rate=args.error_rate)
+    print(f"Замена API QRZ.ru: http://{args.host}:{server.server_address[1]}/ (Ctrl+C — остановить)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        qrz = server.qrz
+        print(f"Входов: {qrz.logins}, запросов позывных: {qrz.lookups}, ошибок: {qrz.errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,140 @@
-import requests
+"""
+Поиск данных корреспондента по позывному через XML API QRZ.ru.
+Все запросы идут через один requests.Session: соединение с api.qrz.ru
+(DNS, TCP, TLS) устанавливается один раз и переиспользуется (keep-alive),
+сбои соединения и ответы 502/503/504 повторяются с нарастающей паузой.
+Время каждого запроса запоминается (last_latency, latency_stats()).
+Авторизация выполняется при первом поиске; истёкшая сессия обновляется
+одним повторным входом (один на все потоки), и запрос повторяется.
+requests и разбор XML загружаются при первом запросе, а не при запуске
+программы: с выключенным поиском они не нужны вовсе.
+"""
+import threading
+import time
 import logging
-import xml.etree.ElementTree as ET
+
+# Адрес XML API (для проверки без сети — адрес mock_qrz_server.py)
+API_URL = "https://api.qrz.ru/"
+# Таймауты по умолчанию: установка соединения и ожидание ответа, с
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+# Сколько соединений с сервером держать открытыми
+POOL_SIZE = 4
+# Повторы при сбое соединения и пауза между ними (0.5, 1, 2... с)
+RETRIES = 2
+BACKOFF_FACTOR = 0.5
+# После неудачной авторизации следующая попытка не раньше чем через, с
+LOGIN_RETRY_INTERVAL = 60
+
+
+class LookupFailed(Exception):
+    """Сервис поиска недоступен или отклонил запрос (это не «позывной не найден»)."""
+
+
+class SessionExpired(LookupFailed):
+    """Сервер не принял session key: сессия истекла или недействительна."""
+
+
+def make_http_session(pool_size=POOL_SIZE, retries=RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """Сессия HTTP с пулом постоянных соединений и повторами для идемпотентных GET."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET']), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _parse_xml(data):
+    import xml.etree.ElementTree as ET
+    return ET.fromstring(data)
+
 
 class QRZLookup:
-    def __init__(self, username, password):
+    name = 'qrz'  # имя источника в цепочке поиска (lookup_chain)
+
+    def __init__(self, username, password, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 session=None, base_url=API_URL):
         self.username = username
         self.password = password
         self.session_key = None
+        self.login_error = None  # текст ошибки последней неудачной авторизации
+        self._login_failed_at = None
+        # Вход выполняет один поток, остальные ждут его результат
+        self._session_lock = threading.Lock()
         self.agent = "blind_log"
-        self.base_url = "https://api.qrz.ru/"
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.timeout = (connect_timeout, read_timeout)
+        # Сессия HTTP создаётся при первом запросе (свойство http)
+        self._http = session
+        self._http_lock = threading.Lock()
+        if session is not None:
+            session.headers['User-Agent'] = self.agent
+        # Время запросов к серверу, с (запросы идут из нескольких потоков)
+        self._latency_lock = threading.Lock()
+        self.last_latency = None
+        self._latency_count = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def http(self):
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    session = make_http_session()
+                    session.headers['User-Agent'] = self.agent
+                    self._http = session
+        return self._http
+
+    def _get(self, endpoint, params):
+        """GET к API через общую сессию; время запроса попадает в статистику."""
+        started = time.perf_counter()
+        try:
+            response = self.http.get(f"{self.base_url}{endpoint}", params=params, timeout=self.timeout)
+        finally:
+            latency = time.perf_counter() - started
+            with self._latency_lock:
+                self.last_latency = latency
+                self._latency_count += 1
+                self._latency_total += latency
+                self._latency_max = max(self._latency_max, latency)
+        logging.info(f"QRZ.ru {endpoint}: {latency * 1000:.0f} мс")
+        response.raise_for_status()
+        return response.text
+
+    def latency_stats(self):
+        """Число запросов, среднее, наибольшее и последнее время ответа, мс."""
+        with self._latency_lock:
+            count = self._latency_count
+            total = self._latency_total
+            longest = self._latency_max
+            last = self.last_latency
+        return {
+            'requests': count,
+            'avg_ms': total / count * 1000 if count else 0.0,
+            'max_ms': longest * 1000,
+            'last_ms': last * 1000 if last is not None else None,
+        }
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
 
     def login(self):
         try:
-            url = f"{self.base_url}login"
             params = {
                 "u": self.username,
                 "p": self.password,
                 "agent": self.agent
             }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.text
-            root = ET.fromstring(data)
+            data = self._get("login", params)
+            root = _parse_xml(data)
             # QRZ.ru возвращает <Session> (с большой буквы), а не <session_id> напрямую
             # root -> QRZDatabase -> Session -> session_id
             session_id = None
@@ -40,67 +153,111 @@ class QRZLookup:
                 # Пробуем найти ошибку
                 error = root.find('.//error')
                 if error is not None:
+                    self.login_error = error.text
                     logging.error(f"Ошибка авторизации на QRZ.ru: {error.text}")
                     print(f"Ошибка авторизации на QRZ.ru: {error.text}")
                 else:
+                    self.login_error = data
                     logging.error(f"Ошибка авторизации на QRZ.ru: {data}")
                     print(f"Ошибка авторизации на QRZ.ru: {data}")
                 return False
         except Exception as e:
+            self.login_error = str(e)
             logging.error(f"Ошибка авторизации: {e}")
             print(f"Ошибка авторизации: {e}")
             return False
 
+    def _login_locked(self):
+        """Вход под self._session_lock; LookupFailed, если войти не удалось."""
+        if self._login_failed_at is not None and time.monotonic() - self._login_failed_at < LOGIN_RETRY_INTERVAL:
+            # Неверный пароль не исправится сам: не заваливаем сервер попытками входа
+            raise LookupFailed(f"Ошибка авторизации на QRZ.ru: {self.login_error}")
+        if not self.login():
+            self._login_failed_at = time.monotonic()
+            raise LookupFailed(f"Ошибка авторизации на QRZ.ru: {self.login_error}")
+        self._login_failed_at = None
+        self.login_error = None
+
+    def _ensure_session(self):
+        """session key; при первом обращении выполняется вход."""
+        session_key = self.session_key
+        if session_key:
+            return session_key
+        with self._session_lock:
+            if not self.session_key:
+                self._login_locked()
+            return self.session_key
+
+    def _renew_session(self, stale_key):
+        """Новый session key взамен отклонённого сервером. Если другой поток
+        уже вошёл заново, используется его ключ — повторного входа нет."""
+        with self._session_lock:
+            if self.session_key in (stale_key, None):
+                self.session_key = None
+                logging.info("Сессия QRZ.ru истекла, повторная авторизация")
+                self._login_locked()
+            return self.session_key
+
     def lookup_call(self, callsign):
-        if not self.session_key:
-            logging.error("Нет session key. Выполните авторизацию.")
-            print("Нет session key. Выполните авторизацию.")
+        try:
+            return self.lookup(callsign)
+        except Exception as e:
+            logging.error(f"Ошибка поиска позывного: {e}")
+            print(f"Ошибка поиска позывного: {e}")
             return None
+
+    def lookup(self, callsign):
+        """Данные позывного {'name', 'city'}; None — позывной не найден.
+        Ошибки сети и авторизации передаются исключением (ответ нельзя кэшировать).
+        Если сессия истекла, выполняется повторный вход и один повтор запроса."""
+        session_key = self._ensure_session()
         try:
-            url = f"{self.base_url}callsign"
-            params = {
-                "id": self.session_key,
-                "callsign": callsign
+            return self._lookup(callsign, session_key)
+        except SessionExpired as e:
+            logging.info(f"QRZ.ru: {e}")
+            return self._lookup(callsign, self._renew_session(session_key))
+
+    def _lookup(self, callsign, session_key):
+        params = {
+            "id": session_key,
+            "callsign": callsign
+        }
+        data = self._get("callsign", params)
+        root = _parse_xml(data)
+        # Ищем первый тег Callsign (без учёта namespace)
+        callsign_elem = None
+        for elem in root.iter():
+            if elem.tag.lower().endswith('callsign'):
+                callsign_elem = elem
+                break
+        if callsign_elem is not None:
+            def get_text(tag):
+                # Ищем только точное совпадение тега (без вхождения в другие, например, surname)
+                for child in callsign_elem:
+                    if child.tag.lower().split('}')[-1] == tag and child.text:
+                        return child.text.strip()
+                return ""
+            result = {
+                "name": get_text("name"),
+                "city": get_text("city"),
             }
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.text
-            root = ET.fromstring(data)
-            # Ищем первый тег Callsign (без учёта namespace)
-            callsign_elem = None
+            logging.info(f"QRZ result for {callsign}: {result}")
+            print(f"QRZ result for {callsign}: {result}")
+            return result
+        else:
+            # Пробуем найти ошибку
+            error = None
             for elem in root.iter():
-                if elem.tag.lower().endswith('callsign'):
-                    callsign_elem = elem
+                if elem.tag.lower().endswith('error') and elem.text:
+                    error = elem.text.strip()
                     break
-            if callsign_elem is not None:
-                def get_text(tag):
-                    # Ищем только точное совпадение тега (без вхождения в другие, например, surname)
-                    for child in callsign_elem:
-                        if child.tag.lower().split('}')[-1] == tag and child.text:
-                            return child.text.strip()
-                    return ""
-                result = {
-                    "name": get_text("name"),
-                    "city": get_text("city"),
-                }
-                logging.info(f"QRZ result for {callsign}: {result}")
-                print(f"QRZ result for {callsign}: {result}")
-                return result
+            if error is not None and 'session' in error.lower():
+                # Сессия истекла или недействительна — это сбой, а не «позывной не найден»
+                raise SessionExpired(f"Ошибка сессии QRZ.ru: {error}")
+            if error is not None:
+                logging.info(f"Позывной {callsign} не найден в базе QRZ.ru: {error}")
+                print(f"Позывной {callsign} не найден в базе QRZ.ru: {error}")
             else:
-                # Пробуем найти ошибку
-                error = None
-                for elem in root.iter():
-                    if elem.tag.lower().endswith('error') and elem.text:
-                        error = elem.text.strip()
-                        break
-                if error is not None:
-                    logging.info(f"Позывной {callsign} не найден в базе QRZ.ru: {error}")
-                    print(f"Позывной {callsign} не найден в базе QRZ.ru: {error}")
-                else:
-                    logging.info(f"Позывной {callsign} не найден в базе QRZ.ru: {data}")
-                    print(f"Позывной {callsign} не найден в базе QRZ.ru: {data}")
-                return None
-        except Exception as e:
-            logging.error(f"Ошибка поиска позывного: {e}")
-            print(f"Ошибка поиска позывного: {e}")
+                logging.info(f"Позывной {callsign} не найден в базе QRZ.ru: {data}")
+                print(f"Позывной {callsign} не найден в базе QRZ.ru: {data}")
             return None
\ No newline at end of file
@@ -3,10 +3,40 @@ import logging
 import nvda_notify
 import os
 import json
+import re
+import tempfile
+import threading
 import utils
+from concurrent.futures import ThreadPoolExecutor
+from autosave import AutosaveWorker, DEFAULT_DELAY_MS
 from datetime import datetime, timedelta
-from qrz_lookup import QRZLookup
-from transliterator import transliterate_russian
+from cty import CountryResolver, load_country_file
+from dupe_index import DupeIndex
+from lookup_cache import LookupCache
+from lookup_chain import DEFAULT_CHAIN, DiskCache, JournalLookup, MemoryCache, ProviderChain
+from qrz_lookup import QRZLookup, API_URL, CONNECT_TIMEOUT, READ_TIMEOUT
+from qso_record import QSORecord, parse_datetime
+from qso_store import QSOStore
+from scp import PartialCallIndex, load_master_file
+from session_log import SessionLog
+from transliterator import transliterate_many, transliterate_russian
+
+# Задержка озвучивания совпадений после последнего нажатия клавиши, мс
+SCP_ANNOUNCE_DELAY_MS = 400
+# Сколько совпадений произносить
+SCP_ANNOUNCE_COUNT = 5
+# Размер порции записей при массовом добавлении в хранилище
+IMPORT_BATCH_SIZE = 10000
+# Сколько ждать записи очереди автосохранения при закрытии, с
+AUTOSAVE_FLUSH_TIMEOUT = 10
+# Сколько запросов к QRZ.ru может выполняться одновременно
+LOOKUP_WORKERS = 2
+# Пауза в наборе позывного, после которой начинается упреждающий поиск, мс
+PREFETCH_DELAY_MS = 600
+# Сколько упреждающих запросов помнить (для подстановки по Enter)
+PREFETCH_KEEP = 16
+# Похоже на полный позывной: [префикс/]префикс, цифра, суффикс из букв[/приставка]
+PLAUSIBLE_CALL = re.compile(r'(?:[A-Z0-9]{1,4}/)?[A-Z0-9]{0,2}[A-Z][A-Z0-9]?[0-9][A-Z]{1,4}(?:/[A-Z0-9]{1,4})?')
 
 class QSOManager:
     def __init__(self, parent=None, settings_manager=None):
@@ -14,41 +44,231 @@ class QSOManager:
         if settings_manager is None:
             raise ValueError("SettingsManager не передан в QSOManager")
         self.settings_manager = settings_manager
-        self._init_qrz_lookup()
+        self.lookup_cache = None  # кэш ответов QRZ.ru (создаётся в _init_lookup_cache)
+        self.qrz_client = None  # клиент QRZ.ru с постоянным HTTP-соединением
+        self.qrz_lookup = None  # цепочка источников поиска (lookup_chain.ProviderChain)
+        # поиск по QRZ.ru идёт в фоновых потоках; устаревшие ответы отбрасываются по номеру запроса
+        self._lookup_pool = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="QRZLookup")
+        self._lookup_future = None
+        self._lookup_generation = 0
+        self._closed = False
+        # упреждающий поиск во время набора: позывной -> future
+        self._prefetch = {}
+        self._prefetch_timer = None
         self.controls = {}
-        self.qso_list = []
-        self.editing_index = None  # Индекс редактируемой записи
+        self.editing_id = None  # id редактируемой записи в хранилище
         # автосохранение сеанса
         self.auto_temp = self.settings_manager.get_option('auto_temp', '0') == '1'
         # temp-файл рядом с приложением
         base = os.path.join(utils.get_app_path(), '')
-        self.temp_file = os.path.join(base, 'blind_log_temp.json')
+        self.temp_file = os.path.join(base, 'blind_log_temp.jsonl')
+        # temp прежних версий (весь журнал одним JSON-массивом) — только для восстановления
+        self.legacy_temp_file = os.path.join(base, 'blind_log_temp.json')
+        self.session_log = SessionLog(self.temp_file)
+        # запись temp идёт в фоновом потоке, изменения объединяются в окне задержки
+        self.autosave = AutosaveWorker(self.session_log, self._get_autosave_delay())
+        # True, когда файл temp отражает текущий журнал и в него можно дописывать операции
+        self._temp_synced = False
+        # отметка экспорта: id последней выгруженной в ADIF записи (0 — ещё ничего не выгружено)
+        self.export_mark = 0
+        # журнал сеанса хранится в своей базе SQLite во временной папке: каждый запуск начинает
+        # новый сеанс (прошлый восстанавливается из temp), второй экземпляр программы базу не трогает
+        fd, self.store_path = tempfile.mkstemp(prefix='blind_log_journal_', suffix='.db')
+        os.close(fd)
+        self.store = QSOStore(self.store_path)
+        # поиск по позывному (цепочка источников использует и журнал)
+        self._init_qrz_lookup()
+        # индекс повторов (позывной, диапазон, режим) для проверки при Enter в поле позывного
+        self.dupe_index = DupeIndex()
+        # индекс фрагментов позывных (Super Check Partial): журнал + файл MASTER.SCP
+        self.scp_index = PartialCallIndex()
+        self.scp_list = None  # список совпадений на форме (создаётся в gui, если включено)
+        self._scp_announce = None
+        self._init_scp()
+        # страна, континент и зоны по позывному из файла cty.dat (без интернета)
+        self.country_resolver = CountryResolver()
+        self._init_cty()
 
     def _refresh_temp_setting(self):
         self.auto_temp = self.settings_manager.get_option('auto_temp', '0') == '1'
+        self.autosave.delay = self._get_autosave_delay() / 1000.0
+
+    def _get_autosave_delay(self):
+        try:
+            return max(0, int(self.settings_manager.get_option('autosave_delay_ms', str(DEFAULT_DELAY_MS))))
+        except ValueError:
+            return DEFAULT_DELAY_MS
 
     def set_controls(self, controls):
         self.controls = controls
         # после привязки контролов возможно потребуется подчитать автосохранение
         self._refresh_temp_setting()
 
+    def _get_float_option(self, key, default):
+        try:
+            return float(self.settings_manager.get_option(key, str(default)))
+        except ValueError:
+            return default
+
+    def _get_hours_option(self, key, default_hours):
+        return self._get_float_option(key, default_hours) * 3600
+
+    def _init_lookup_cache(self):
+        """Кэш ответов QRZ.ru в файле рядом с приложением (один на всё время работы)."""
+        if self.lookup_cache is None:
+            path = os.path.join(utils.get_app_path(), 'blind_log_lookup_cache.db')
+            try:
+                self.lookup_cache = LookupCache(path)
+            except Exception as e:
+                logging.error(f"Ошибка открытия кэша поиска позывных: {e}")
+                self.lookup_cache = LookupCache()
+        cache = self.lookup_cache
+        cache.ttl = self._get_hours_option('qrz_cache_ttl_hours', 720)
+        cache.negative_ttl = self._get_hours_option('qrz_cache_negative_ttl_hours', 24)
+        try:
+            cache.max_entries = max(1, int(self.settings_manager.get_option('qrz_cache_max_entries', '50000')))
+        except ValueError:
+            pass
+        return cache
+
     def _init_qrz_lookup(self):
         qrz_username = self.settings_manager.settings.get("qrz_username", "")
         qrz_password = self.settings_manager.settings.get("qrz_password", "")
         use_qrz = self.settings_manager.settings.get("use_qrz_lookup", '1') == '1'
-        self.qrz_lookup = QRZLookup(qrz_username, qrz_password) if use_qrz else None
-        if use_qrz and self.qrz_lookup and not self.qrz_lookup.login():
-            wx.MessageBox(
-                "Ошибка авторизации на QRZ.ru. Проверьте логин и пароль для XML API.",
-                "Ошибка",
-                wx.OK | wx.ICON_ERROR
-            )
+        self.qrz_prefetch = use_qrz and self.settings_manager.get_option('qrz_prefetch', '0') == '1'
+        self._prefetch.clear()
+        if self.qrz_lookup is not None:
+            self.qrz_lookup.close()
+        if self.qrz_client is not None:
+            self.qrz_client.close()
+        self.qrz_client = QRZLookup(
+            qrz_username, qrz_password,
+            connect_timeout=self._get_float_option('qrz_connect_timeout', CONNECT_TIMEOUT),
+            read_timeout=self._get_float_option('qrz_read_timeout', READ_TIMEOUT),
+            base_url=self.settings_manager.get_option('qrz_api_url', API_URL) or API_URL,
+        ) if use_qrz else None
+        # Вход на QRZ.ru выполняется при первом поиске (запуск программы не ждёт сеть);
+        # ошибка авторизации озвучивается как ошибка поиска
+        self.qrz_lookup = self._build_lookup_chain() if use_qrz else None
+
+    def _build_lookup_chain(self):
+        """Источники из настройки lookup_chain по порядку; повторные запросы и работа
+        без сети обслуживаются кэшами и журналом, QRZ.ru спрашивается последним."""
+        factories = {
+            'memory': lambda: (MemoryCache(), None),
+            'disk': lambda: (DiskCache(self._init_lookup_cache()), None),
+            'journal': lambda: (JournalLookup(self.store), None),
+            'qrz': lambda: (self.qrz_client, self._get_float_option('qrz_lookup_timeout', 15) or None),
+        }
+        providers = []
+        for name in self.settings_manager.get_option('lookup_chain', DEFAULT_CHAIN).split(','):
+            name = name.strip().lower()
+            if name not in factories:
+                if name:
+                    logging.error(f"Неизвестный источник поиска позывных: {name}")
+                continue
+            providers.append(factories[name]())
+        return ProviderChain(providers)
 
     def reload_settings(self):
         self.settings_manager.load_settings()
         self._init_qrz_lookup()
+        self._init_scp()
+        self._init_cty()
         self._refresh_temp_setting()
 
+    def _init_scp(self):
+        """Загружает файл MASTER.SCP в фоне, если подсказка позывных включена."""
+        self.use_scp = self.settings_manager.get_option('use_scp', '0') == '1'
+        scp_file = self.settings_manager.get_option('scp_file', '')
+        # номер загрузки: результат устаревшей фоновой загрузки отбрасывается
+        self._scp_generation = getattr(self, '_scp_generation', 0) + 1
+        if not self.use_scp or not scp_file:
+            self.scp_index.set_master_calls([])
+            return
+        generation = self._scp_generation
+
+        def load():
+            calls = load_master_file(scp_file)
+            index = PartialCallIndex()
+            index.set_master_calls(calls)
+            wx.CallAfter(self._on_scp_loaded, index, len(calls), generation)
+
+        threading.Thread(target=load, name="SCPLoader", daemon=True).start()
+
+    def _on_scp_loaded(self, index, count, generation):
+        if generation != self._scp_generation:
+            return
+        # Позывные журнала добавляем в главном потоке, где меняется журнал
+        for qso in self.store.iter_qsos():
+            index.add_journal_call(qso.call)
+        self.scp_index = index
+        logging.info(f"Загружено позывных для подсказки: {count}")
+
+    def _cty_path(self):
+        """Файл стран из настроек, иначе cty.dat рядом с программой (или '')."""
+        path = self.settings_manager.get_option('cty_file', '')
+        if path:
+            return path
+        path = os.path.join(utils.get_app_path(), 'cty.dat')
+        return path if os.path.exists(path) else ''
+
+    def _init_cty(self):
+        """Загружает файл стран cty.dat в фоне."""
+        cty_file = self._cty_path()
+        self._cty_generation = getattr(self, '_cty_generation', 0) + 1
+        if not cty_file:
+            self.country_resolver = CountryResolver()
+            return
+        generation = self._cty_generation
+
+        def load():
+            resolver = load_country_file(cty_file)
+            wx.CallAfter(self._on_cty_loaded, resolver, generation)
+
+        threading.Thread(target=load, name="CtyLoader", daemon=True).start()
+
+    def _on_cty_loaded(self, resolver, generation):
+        if generation != self._cty_generation:
+            return
+        self.country_resolver = resolver
+        logging.info(f"Загружено префиксов и позывных стран: {len(resolver)}")
+
+    def _apply_country(self, qso, replace=False):
+        """Заполняет в extra поля COUNTRY, CONT, CQZ, ITUZ по позывному; replace=True
+        заменяет уже записанные (позывной изменён). Возвращает True, если запись изменилась."""
+        fields = self.country_resolver.adif_fields(qso.call)
+        extra = dict(qso.extra) if qso.extra else {}
+        if replace:
+            for name in ('COUNTRY', 'CONT', 'CQZ', 'ITUZ'):
+                extra.pop(name, None)
+        for name, value in fields.items():
+            extra.setdefault(name, value)
+        if extra == (qso.extra or {}):
+            return False
+        qso.extra = extra or None
+        return True
+
+    def resolve_countries(self):
+        """Заполняет страну, континент и зоны у всех записей журнала, где их нет.
+        Записи меняются одной транзакцией, журнал обновляется один раз; возвращает число изменённых."""
+        changed = [(qso_id, qso) for qso_id, qso in self.store.iter_items() if self._apply_country(qso)]
+        if not changed:
+            return 0
+        self.store.update_many(changed)
+        if self.auto_temp:
+            self.save_temp()
+        self._update_journal()
+        return len(changed)
+
+    def _index_add(self, qso):
+        self.dupe_index.add(qso)
+        self.scp_index.add_journal_call(qso.call)
+
+    def _index_remove(self, qso):
+        self.dupe_index.remove(qso)
+        self.scp_index.remove_journal_call(qso.call)
+
     def add_qso(self, event):
         """Добавление QSO: читаем только видимые поля; требуем только CALL."""
         visible = self.settings_manager.get_visible_fields()
@@ -111,34 +331,43 @@ class QSOManager:
                     val = ''
             return (val or '').strip()
 
-        qso_data = {
-            'call': call_val,
-            'name': read_str('name', '').title(),
-            'city': read_str('city', '').title(),
-            'qth': read_str('qth', '').upper(),
-            'band': read_str('band', ''),
-            'mode': read_str('mode', ''),
-            'freq': freq_value,
-            'rst_received': read_str('rst_received', ''),
-            'rst_sent': read_str('rst_sent', ''),
-            'comment': read_str('comment', ''),
-            'datetime': datetime_str,
-        }
-
         # Транслитерация полей, кроме позывного
-        qso_data['name'] = transliterate_russian(qso_data['name'])
-        qso_data['city'] = transliterate_russian(qso_data['city'])
-        qso_data['comment'] = transliterate_russian(qso_data['comment'])
+        qso_data = QSORecord(
+            call=call_val,
+            name=transliterate_russian(read_str('name', '').title()),
+            city=transliterate_russian(read_str('city', '').title()),
+            qth=read_str('qth', '').upper(),
+            band=read_str('band', ''),
+            mode=read_str('mode', ''),
+            rst_received=read_str('rst_received', ''),
+            rst_sent=read_str('rst_sent', ''),
+            freq=freq_value,
+            comment=transliterate_russian(read_str('comment', '')),
+            timestamp=parse_datetime(datetime_str),
+        )
 
-        if self.editing_index is not None:
-            self.qso_list[self.editing_index] = qso_data
-            self.editing_index = None
+        # Если редактируемую запись успели удалить, форма сохраняется как новое QSO
+        old_qso = self.store.get(self.editing_id) if self.editing_id is not None else None
+        if old_qso is not None:
+            self._index_remove(old_qso)
+            # Поля ADIF, которых нет на форме, при редактировании сохраняются
+            qso_data.extra = old_qso.extra
+            self._apply_country(qso_data, replace=old_qso.call != qso_data.call)
+            self._index_add(qso_data)
+            self.store.update(self.editing_id, qso_data)
+            self._log_change('edit', self.editing_id, qso_data.to_dict())
+            index = self.store.index_of(self.editing_id)
+            self.editing_id = None
+            if index is not None:
+                self._update_journal(index, index)
         else:
-            self.qso_list.append(qso_data)
-        if self.auto_temp:
-            self.save_temp()
+            self.editing_id = None
+            self._apply_country(qso_data)
+            qso_id = self.store.add(qso_data)
+            self._index_add(qso_data)
+            self._log_change('add', qso_id, qso_data.to_dict())
+            self._update_journal(len(self.store) - 1)
 
-        self._update_journal()
         self._clear_fields()
         if call_ctrl:
             call_ctrl.SetFocus()
@@ -153,63 +382,230 @@ class QSOManager:
         # Переключаемся на вкладку "Добавить QSO" для удобства пользователя
         self.parent.notebook.SetSelection(0)
         
-        qso_data = self.qso_list[selected_index]
+        qso_data = self.store.get_at(selected_index)
         # Устанавливаем значения только в тех контролах, которые присутствуют
         if 'call' in self.controls:
-            self.controls['call'].SetValue(qso_data.get('call', ''))
+            self.controls['call'].SetValue(qso_data.call)
         if 'name' in self.controls:
-            self.controls['name'].SetValue(qso_data.get('name', ''))
+            self.controls['name'].SetValue(qso_data.name)
         if 'city' in self.controls:
-            self.controls['city'].SetValue(qso_data.get('city', ''))
+            self.controls['city'].SetValue(qso_data.city)
         if 'qth' in self.controls:
-            self.controls['qth'].SetValue(qso_data.get('qth', ''))
+            self.controls['qth'].SetValue(qso_data.qth)
         if 'band' in self.controls and hasattr(self.controls['band'], 'SetStringSelection'):
             try:
-                self.controls['band'].SetStringSelection(qso_data.get('band', ''))
+                self.controls['band'].SetStringSelection(qso_data.band)
             except Exception:
                 pass
         if 'mode' in self.controls and hasattr(self.controls['mode'], 'SetStringSelection'):
             try:
-                self.controls['mode'].SetStringSelection(qso_data.get('mode', ''))
+                self.controls['mode'].SetStringSelection(qso_data.mode)
             except Exception:
                 pass
         if 'freq' in self.controls:
-            self.controls['freq'].SetValue(qso_data.get('freq', ''))
+            self.controls['freq'].SetValue(qso_data.freq)
         if 'rst_received' in self.controls:
-            self.controls['rst_received'].SetValue(qso_data.get('rst_received', ''))
+            self.controls['rst_received'].SetValue(qso_data.rst_received)
         if 'rst_sent' in self.controls:
-            self.controls['rst_sent'].SetValue(qso_data.get('rst_sent', ''))
+            self.controls['rst_sent'].SetValue(qso_data.rst_sent)
         if 'comment' in self.controls:
-            self.controls['comment'].SetValue(qso_data.get('comment', ''))
+            self.controls['comment'].SetValue(qso_data.comment)
         
-        self.editing_index = selected_index  # Сохранение индекса редактируемой записи
+        self.editing_id = self.store.id_at(selected_index)  # Сохранение id редактируемой записи
         self.controls['call'].SetFocus()  # Установка фокуса на поле "Позывной"
 
     # --- автотемп методы ---
     def save_temp(self):
+        """Ставит в очередь полный снимок журнала в temp (раз за сеанс и после экспорта).
+        Снимок читается из хранилища уже в фоновом потоке."""
+        def snapshot_items():
+            return ((qso_id, qso.to_dict()) for qso_id, qso in self.store.iter_items())
+        self.autosave.submit_snapshot(snapshot_items, self.export_mark)
+        self._temp_synced = True
         try:
-            with open(self.temp_file, 'w', encoding='utf-8') as f:
-                json.dump(self.qso_list, f, ensure_ascii=False)
+            if os.path.exists(self.legacy_temp_file):
+                os.remove(self.legacy_temp_file)
         except Exception as e:
-            logging.error(f"Ошибка сохранения temp: {e}")
+            logging.error(f"Ошибка удаления temp: {e}")
 
-    def load_temp(self):
-        if not os.path.exists(self.temp_file):
-            return None
+    def _log_change(self, op, qso_id, qso=None):
+        """Ставит одну операцию в очередь автосохранения; основной поток диск не ждёт."""
+        if not self.auto_temp:
+            return
+        if not self._temp_synced:
+            # Снимок уже содержит это изменение: хранилище обновлено раньше
+            self.save_temp()
+            return
+        self.autosave.submit(op, qso_id, qso)
+
+    def temp_count(self):
+        """Сколько записей лежит в temp (0 — восстанавливать нечего)."""
+        try:
+            if self.session_log.exists():
+                return self.session_log.record_count()
+            if os.path.exists(self.legacy_temp_file):
+                with open(self.legacy_temp_file, 'r', encoding='utf-8') as f:
+                    return len(json.load(f))
+        except Exception as e:
+            logging.error(f"Ошибка чтения temp: {e}")
+        return 0
+
+    def restore_temp(self):
+        """Восстанавливает журнал прошлого сеанса из temp. Операции файла проигрываются
+        прямо в хранилище порциями, записи сохраняют свои id, и весь журнал в памяти
+        не собирается."""
         try:
-            with open(self.temp_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data
+            if self.session_log.exists():
+                self._replay_ops(self.session_log.replay())
+            elif os.path.exists(self.legacy_temp_file):
+                with open(self.legacy_temp_file, 'r', encoding='utf-8') as f:
+                    self._bulk_add(QSORecord.from_dict(item) for item in json.load(f))
         except Exception as e:
             logging.error(f"Ошибка загрузки temp: {e}")
-            return None
+        self._update_journal()
+
+    def _replay_ops(self, ops, batch_size=IMPORT_BATCH_SIZE):
+        ids = []
+        batch = []
+
+        def flush():
+            self.store.add_many(batch, ids=ids)
+            for qso in batch:
+                self._index_add(qso)
+            ids.clear()
+            batch.clear()
+
+        for op, qso_id, data in ops:
+            if op == 'add' and qso_id > self.store.last_id() and (not ids or qso_id > ids[-1]):
+                ids.append(qso_id)
+                batch.append(QSORecord.from_dict(data or {}))
+                if len(batch) >= batch_size:
+                    flush()
+                continue
+            if batch:
+                flush()
+            if op in ('add', 'edit'):
+                old = self.store.get(qso_id)
+                if old is not None:
+                    self._index_remove(old)
+                    qso = QSORecord.from_dict(data or {})
+                    self.store.update(qso_id, qso)
+                    self._index_add(qso)
+            elif op == 'del':
+                old = self.store.get(qso_id)
+                if old is not None:
+                    self._index_remove(old)
+                    self.store.delete(qso_id)
+            elif op == 'mark':
+                self.export_mark = qso_id
+        if batch:
+            flush()
 
     def clear_temp(self):
-        if os.path.exists(self.temp_file):
+        self.autosave.submit_clear()
+        try:
+            if os.path.exists(self.legacy_temp_file):
+                os.remove(self.legacy_temp_file)
+        except Exception as e:
+            logging.error(f"Ошибка удаления temp: {e}")
+        # Следующее изменение снова начнёт temp с полного снимка
+        self._temp_synced = False
+
+    def close(self):
+        """Дописывает очередь автосохранения и закрывает хранилище (при выходе из программы)."""
+        self._closed = True
+        if self._prefetch_timer is not None:
+            self._prefetch_timer.Stop()
+            self._prefetch_timer = None
+        self._lookup_pool.shutdown(wait=False, cancel_futures=True)
+        self.autosave.stop(timeout=AUTOSAVE_FLUSH_TIMEOUT)
+        if self.qrz_lookup is not None:
+            self.qrz_lookup.close()
+        self.store.close()
+        for path in (self.store_path, self.store_path + '-wal', self.store_path + '-shm'):
             try:
-                os.remove(self.temp_file)
-            except Exception as e:
-                logging.error(f"Ошибка удаления temp: {e}")
+                os.remove(path)
+            except OSError:
+                pass
+        if self.lookup_cache is not None:
+            self.lookup_cache.close()
+        if self.qrz_client is not None:
+            logging.info(f"Запросы к QRZ.ru: {self.qrz_client.latency_stats()}")
+            self.qrz_client.close()
+
+    def _bulk_add(self, qsos, batch_size=IMPORT_BATCH_SIZE):
+        """Добавляет записи из итератора порциями (одна транзакция на порцию); возвращает их число."""
+        count = 0
+        batch = []
+        for qso in qsos:
+            batch.append(qso)
+            if len(batch) >= batch_size:
+                count += self._add_batch(batch)
+                batch = []
+        if batch:
+            count += self._add_batch(batch)
+        return count
+
+    def _add_batch(self, batch):
+        self.store.add_many(batch)
+        for qso in batch:
+            self._index_add(qso)
+        return len(batch)
+
+    def pending_export_count(self):
+        """Сколько записей добавлено после последнего экспорта."""
+        return self.store.count_after(self.export_mark)
+
+    def iter_new_qsos(self, until_id=None):
+        """Записи, добавленные после последнего экспорта, в порядке журнала."""
+        return self.store.iter_qsos(after_id=self.export_mark, until_id=until_id)
+
+    def set_export_mark(self, qso_id=None):
+        """Запоминает id последней экспортированной записи (по умолчанию — последней в журнале)."""
+        if qso_id is None:
+            qso_id = self.store.last_id()
+        if qso_id == self.export_mark:
+            return
+        self.export_mark = qso_id
+        self._log_change('mark', qso_id)
+
+    def import_qsos(self, qsos):
+        """Массовое добавление (импорт ADIF): журнал обновляется один раз в конце,
+        temp получает один снимок вместо операции на каждую запись."""
+        count = self._bulk_add(qsos)
+        if count and self.auto_temp:
+            self.save_temp()
+        self._update_journal()
+        return count
+
+    def enrich_qsos(self, updates):
+        """Заполняет пустые поля записей данными поиска: updates — пары (id, {'name', 'city'}).
+        Записи меняются одной транзакцией, журнал обновляется один раз; возвращает число изменённых.
+        Значения, как и при вводе QSO, пишутся латиницей с заглавной буквы."""
+        updates = list(updates)
+        # Столбцы имён и городов транслитерируются пакетом: одинаковые значения — один раз
+        columns = {field: transliterate_many([(data.get(field) or "").title() for _, data in updates])
+                   for field in ('name', 'city')}
+        changed = []
+        for row, (qso_id, _) in enumerate(updates):
+            qso = self.store.get(qso_id)
+            if qso is None:
+                continue  # запись удалена, пока шёл поиск
+            modified = False
+            for field in ('name', 'city'):
+                value = columns[field][row]
+                if value and not getattr(qso, field):
+                    setattr(qso, field, value)
+                    modified = True
+            if modified:
+                changed.append((qso_id, qso))
+        if not changed:
+            return 0
+        self.store.update_many(changed)
+        if self.auto_temp:
+            self.save_temp()
+        self._update_journal()
+        return len(changed)
 
     def del_qso(self, event):
         selected_index = self.journal_list.GetFirstSelected()
@@ -217,23 +613,23 @@ class QSOManager:
             self._show_error("Выберите запись для удаления")
             return
         
-        self.qso_list.pop(selected_index)
-        if self.auto_temp:
-            self.save_temp()
-        self._update_journal()
+        qso_id = self.store.id_at(selected_index)
+        old_qso = self.store.get(qso_id)
+        if old_qso is not None:
+            self._index_remove(old_qso)
+        self.store.delete(qso_id)
+        self._log_change('del', qso_id)
+        if self.editing_id == qso_id:
+            self.editing_id = None  # удалена запись, открытая для редактирования
+        # строки после удалённой сдвигаются вверх
+        self._update_journal(selected_index)
         self.journal_list.SetFocus()  # Установка фокуса на список записей
         self._show_notification("QSO удален из журнала")
 
-    def _update_journal(self):
-        # Обновление журнала согласно self.journal_columns (список полей в нужном порядке)
-        self.journal_list.DeleteAllItems()
-        for idx, qso in enumerate(self.qso_list):
-            # Вставляем пустую строку и заполняем колонки по списку
-            self.journal_list.InsertItem(idx, "")
-            for col, field in enumerate(getattr(self, 'journal_columns', [])):
-                val = qso.get(field, '')
-                # Форматирование: datetime остаётся как есть
-                self.journal_list.SetItem(idx, col, val)
+    def _update_journal(self, first=0, last=None):
+        # Журнал виртуальный: обновляем число строк и перерисовываем только изменённые
+        # (колонки берутся из self.journal_columns при отрисовке)
+        self.journal_list.refresh_rows(first, last)
 
     def _clear_fields(self):
         """
@@ -300,30 +696,189 @@ class QSOManager:
             self.controls['rst_sent'].SetValue("59")
             
 
+    def _get_choice_value(self, key):
+        ctrl = self.controls.get(key)
+        if ctrl is None:
+            return ''
+        try:
+            return ctrl.GetStringSelection()
+        except Exception:
+            return ''
+
+    def check_dupe(self, callsign):
+        """Возвращает (диапазон, режим, число повторов) для позывного с текущими band/mode формы."""
+        band = self._get_choice_value('band')
+        mode = self._get_choice_value('mode')
+        count = self.dupe_index.count(callsign, band, mode)
+        if count and self.editing_id is not None:
+            # Редактируемая запись сама по себе повтором не считается
+            editing = self.store.get(self.editing_id)
+            if editing is not None and DupeIndex.key(editing.call, editing.band, editing.mode) == \
+                    DupeIndex.key(callsign, band, mode):
+                count -= 1
+        return band, mode, count
+
+    def on_callsign_text(self, event):
+        """Изменение поля позывного: обновляем список совпадений (Super Check Partial)."""
+        event.Skip()
+        if self.qrz_prefetch and 'call' in self.controls:
+            self._schedule_prefetch(self.controls['call'].GetValue())
+        if not self.use_scp or self.scp_list is None or 'call' not in self.controls:
+            return
+        fragment = self.controls['call'].GetValue()
+        matches = self.scp_index.search(fragment)
+        self.scp_list.Set(matches)
+        # Озвучиваем с задержкой, чтобы не перебивать набор позывного
+        if self._scp_announce is not None:
+            self._scp_announce.Stop()
+        self._scp_announce = wx.CallLater(SCP_ANNOUNCE_DELAY_MS, self._announce_scp, fragment, matches)
+
+    def _announce_scp(self, fragment, matches):
+        self._scp_announce = None
+        if 'call' not in self.controls or self.controls['call'].GetValue() != fragment:
+            return
+        if not matches:
+            return
+        if len(matches) == 1 and matches[0] == fragment.strip().upper():
+            return
+        spoken = ", ".join(matches[:SCP_ANNOUNCE_COUNT])
+        rest = len(matches) - SCP_ANNOUNCE_COUNT
+        if rest > 0:
+            spoken += f" и ещё {rest}"
+        nvda_notify.nvda_notify(f"Совпадения: {spoken}")
+
+    def on_scp_choose(self, event):
+        """Подстановка выбранного совпадения в поле позывного."""
+        if self.scp_list is None or 'call' not in self.controls:
+            return
+        selection = self.scp_list.GetStringSelection()
+        if not selection:
+            return
+        call_ctrl = self.controls['call']
+        call_ctrl.ChangeValue(selection)
+        call_ctrl.SetInsertionPointEnd()
+        call_ctrl.SetFocus()
+        self.scp_list.Set([])
+        nvda_notify.nvda_notify(f"Позывной {selection}")
+
+    def on_scp_key(self, event):
+        if event.GetKeyCode() in (wx.WXK_RETURN, wx.WXK_NUMPAD_ENTER):
+            self.on_scp_choose(event)
+        else:
+            event.Skip()
+
     def on_callsign_enter(self, event):
         """Обработчик события нажатия Enter в поле позывного."""
+        callsign = self.controls['call'].GetValue().strip().upper()
+        is_dupe = False
+        if callsign:
+            band, mode, count = self.check_dupe(callsign)
+            if count:
+                is_dupe = True
+                nvda_notify.nvda_notify(f"Повтор: {callsign} уже в журнале на {band} {mode}")
+                logging.info(f"Повтор: {callsign} на {band} {mode} ({count})")
         if not self.qrz_lookup:
-            nvda_notify.nvda_notify("Поиск по QRZ.ru отключён в настройках.")
+            if not is_dupe:
+                nvda_notify.nvda_notify("Поиск по QRZ.ru отключён в настройках.")
             return
-        callsign = self.controls['call'].GetValue().strip().upper()
         if not callsign:
             return
+        self._start_lookup(callsign)
+
+    def _submit_lookup(self, callsign):
+        """Future с парой (результат, ошибка) поиска позывного или None, если пул остановлен."""
+        lookup = self.qrz_lookup
+
+        def run():
+            try:
+                return lookup.lookup_call(callsign), None
+            except Exception as e:
+                return None, e
+
         try:
-            result = self.qrz_lookup.lookup_call(callsign)
-            if result:
-                # Вставляем значения из QRZ.ru только если они не пустые
-                if 'name' in self.controls:
-                    self.controls['name'].SetValue(result.get("name", ""))
-                if 'city' in self.controls:
-                    self.controls['city'].SetValue(result.get("city", ""))
-                nvda_notify.nvda_notify(f"Данные для {callsign} успешно загружены")
-                print(f"QRZ: Данные для {callsign} успешно загружены: {result}")
-                logging.info(f"QRZ: Данные для {callsign} успешно загружены: {result}")
-            else:
-                nvda_notify.nvda_notify(f"Позывной {callsign} не найден в базе QRZ.ru")
-                print(f"QRZ: Позывной {callsign} не найден в базе QRZ.ru")
-                logging.warning(f"QRZ: Позывной {callsign} не найден в базе QRZ.ru")
-        except Exception as e:
-            nvda_notify.nvda_notify(f"Ошибка поиска позывного: {e}")
-            print(f"Ошибка поиска позывного: {e}")
-            logging.error(f"Ошибка поиска позывного: {e}")
\ No newline at end of file
+            return self._lookup_pool.submit(run)
+        except RuntimeError:
+            return None  # пул уже остановлен (программа закрывается)
+
+    def _schedule_prefetch(self, text):
+        """Откладывает упреждающий поиск до паузы в наборе позывного."""
+        if self._prefetch_timer is not None:
+            self._prefetch_timer.Stop()
+        self._prefetch_timer = wx.CallLater(PREFETCH_DELAY_MS, self._prefetch_call, text)
+
+    def _prefetch_call(self, text):
+        """Поиск набираемого позывного заранее: ответ ложится в кэш и подставляется по Enter сразу."""
+        self._prefetch_timer = None
+        if self._closed or not self.qrz_lookup or 'call' not in self.controls:
+            return
+        if self.controls['call'].GetValue() != text:
+            return
+        callsign = text.strip().upper()
+        if callsign in self._prefetch or not PLAUSIBLE_CALL.fullmatch(callsign):
+            return
+        # Ещё не начатые запросы по недонабранным позывным больше не нужны
+        for queued, future in list(self._prefetch.items()):
+            if future.cancel():
+                del self._prefetch[queued]
+        future = self._submit_lookup(callsign)
+        if future is None:
+            return
+        self._prefetch[callsign] = future
+        if len(self._prefetch) > PREFETCH_KEEP:
+            del self._prefetch[next(iter(self._prefetch))]
+        logging.info(f"QRZ: упреждающий поиск {callsign}")
+
+    def _start_lookup(self, callsign):
+        """Ставит поиск позывного в пул потоков: окно и экранный диктор не ждут ответа сети."""
+        self._lookup_generation += 1
+        generation = self._lookup_generation
+        # Ещё не начатый запрос по прежнему позывному больше не нужен
+        if self._lookup_future is not None:
+            self._lookup_future.cancel()
+
+        def done(future):
+            if future.cancelled():
+                return
+            result, error = future.result()
+            wx.CallAfter(self._on_lookup_done, callsign, generation, result, error)
+
+        # Упреждающий запрос по этому позывному уже выполнен или идёт — ждём его, а не спрашиваем снова
+        future = self._prefetch.pop(callsign, None)
+        if future is None or future.cancelled():
+            future = self._submit_lookup(callsign)
+            if future is None:
+                return
+        self._lookup_future = future
+        future.add_done_callback(done)
+
+    def _lookup_is_current(self, callsign, generation):
+        if self._closed or generation != self._lookup_generation:
+            return False
+        call_ctrl = self.controls.get('call')
+        try:
+            return call_ctrl is not None and call_ctrl.GetValue().strip().upper() == callsign
+        except RuntimeError:
+            return False  # поле уже уничтожено
+
+    def _on_lookup_done(self, callsign, generation, result, error):
+        """Ответ поиска (в потоке GUI); применяется, только если в поле всё ещё этот позывной."""
+        if not self._lookup_is_current(callsign, generation):
+            logging.info(f"QRZ: ответ для {callsign} устарел и пропущен")
+            return
+        if error is not None:
+            nvda_notify.nvda_notify(f"Ошибка поиска позывного: {error}")
+            print(f"Ошибка поиска позывного: {error}")
+            logging.error(f"Ошибка поиска позывного: {error}")
+        elif result:
+            # Вставляем значения из QRZ.ru только если они не пустые
+            if 'name' in self.controls:
+                self.controls['name'].SetValue(result.get("name", ""))
+            if 'city' in self.controls:
+                self.controls['city'].SetValue(result.get("city", ""))
+            nvda_notify.nvda_notify(f"Данные для {callsign} успешно загружены")
+            print(f"QRZ: Данные для {callsign} успешно загружены: {result}")
+            logging.info(f"QRZ: Данные для {callsign} успешно загружены: {result}")
+        else:
+            nvda_notify.nvda_notify(f"Позывной {callsign} не найден в базе QRZ.ru")
+            print(f"QRZ: Позывной {callsign} не найден в базе QRZ.ru")
+            logging.warning(f"QRZ: Позывной {callsign} не найден в базе QRZ.ru")
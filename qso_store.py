@@ -0,0 +1,197 @@
+"""
+Хранилище журнала QSO на SQLite (модуль sqlite3 из стандартной библиотеки).
+Записи лежат в файле базы, в памяти держится только упорядоченный массив
+идентификаторов, поэтому журнал не обязан целиком помещаться в список.
+Наружу записи отдаются как QSORecord (дата/время — целое число минут).
+Индексы по позывному, диапазону, режиму и дате/времени делают запись
+и поиск одной связи O(log n). Все обращения к базе идут под блокировкой,
+поэтому хранилище можно читать из фоновых потоков (автосохранение, экспорт).
+"""
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+from array import array
+
+from constants import QSO_FIELD_NAMES
+from qso_record import QSORecord, parse_datetime
+
+# Версия схемы таблицы; при несовпадении таблица пересоздаётся
+SCHEMA_VERSION = 3
+
+# Колонки, по которым строятся индексы
+INDEXED_FIELDS = ("call", "band", "mode", "datetime")
+
+# Колонки записи: поля журнала и extra — прочие поля ADIF в JSON
+_STORE_COLUMNS = QSO_FIELD_NAMES + ("extra",)
+_COLUMNS = ", ".join(_STORE_COLUMNS)
+_PLACEHOLDERS = ", ".join("?" for _ in _STORE_COLUMNS)
+_ASSIGNMENTS = ", ".join(f"{name} = ?" for name in _STORE_COLUMNS)
+
+
+class QSOStore:
+    """Журнал QSO в базе SQLite с доступом по позиции в журнале и по id."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        # База — рабочее хранилище сеанса, за сохранность отвечает temp-журнал,
+        # поэтому синхронная запись на диск не нужна
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self._create_schema()
+        # id записей в порядке добавления (id только растут, массив отсортирован)
+        self._ids = array('q', (row[0] for row in self.conn.execute("SELECT id FROM qso ORDER BY id")))
+        self._next_id = (self._ids[-1] + 1) if self._ids else 1
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS qso")
+        # datetime хранится целым числом минут от эпохи, как в QSORecord.timestamp
+        columns = ", ".join("datetime INTEGER" if name == "datetime" else f"{name} TEXT NOT NULL DEFAULT ''"
+                            for name in _STORE_COLUMNS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS qso (id INTEGER PRIMARY KEY, {columns})")
+        for name in INDEXED_FIELDS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_qso_{name} ON qso ({name})")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    @staticmethod
+    def _values(qso):
+        values = qso.to_tuple()
+        extra = values[-1]
+        return values[:-1] + (json.dumps(extra, ensure_ascii=False, separators=(',', ':')) if extra else '',)
+
+    @staticmethod
+    def _to_record(row):
+        extra = row[-1]
+        return QSORecord(*row[:-1], extra=json.loads(extra) if extra else None)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, qso):
+        """Добавляет запись в конец журнала и возвращает её id."""
+        with self._lock:
+            qso_id = self._next_id
+            self.conn.execute(f"INSERT INTO qso (id, {_COLUMNS}) VALUES (?, {_PLACEHOLDERS})",
+                              (qso_id,) + self._values(qso))
+            self.conn.commit()
+            self._ids.append(qso_id)
+            self._next_id += 1
+            return qso_id
+
+    def add_many(self, qsos, ids=None):
+        """Добавляет записи одной транзакцией; возвращает количество добавленных.
+        ids — заданные id записей (восстановление сеанса): они должны возрастать и быть
+        больше уже выданных."""
+        with self._lock:
+            if ids is None:
+                ids = range(self._next_id, self._next_id + len(qsos))
+            rows = [(qso_id,) + self._values(qso) for qso_id, qso in zip(ids, qsos)]
+            if not rows:
+                return 0
+            self.conn.executemany(f"INSERT INTO qso (id, {_COLUMNS}) VALUES (?, {_PLACEHOLDERS})", rows)
+            self.conn.commit()
+            self._ids.extend(ids)
+            self._next_id = rows[-1][0] + 1
+            return len(rows)
+
+    def update(self, qso_id, qso):
+        with self._lock:
+            self.conn.execute(f"UPDATE qso SET {_ASSIGNMENTS} WHERE id = ?", self._values(qso) + (qso_id,))
+            self.conn.commit()
+
+    def update_many(self, items):
+        """Заменяет записи по парам (id, запись) одной транзакцией."""
+        with self._lock:
+            self.conn.executemany(f"UPDATE qso SET {_ASSIGNMENTS} WHERE id = ?",
+                                  [self._values(qso) + (qso_id,) for qso_id, qso in items])
+            self.conn.commit()
+
+    def delete(self, qso_id):
+        with self._lock:
+            index = self.index_of(qso_id)
+            self.conn.execute("DELETE FROM qso WHERE id = ?", (qso_id,))
+            self.conn.commit()
+            if index is not None:
+                del self._ids[index]
+
+    def get(self, qso_id):
+        """Возвращает запись (QSORecord) по id или None."""
+        with self._lock:
+            row = self.conn.execute(f"SELECT {_COLUMNS} FROM qso WHERE id = ?", (qso_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def id_at(self, index):
+        """id записи, стоящей на позиции index в журнале."""
+        return self._ids[index]
+
+    def get_at(self, index):
+        with self._lock:
+            return self.get(self._ids[index])
+
+    def index_of(self, qso_id):
+        """Позиция записи в журнале по id (двоичный поиск) или None."""
+        with self._lock:
+            pos = bisect.bisect_left(self._ids, qso_id)
+            if pos < len(self._ids) and self._ids[pos] == qso_id:
+                return pos
+        return None
+
+    def count_after(self, qso_id, until_id=None):
+        """Сколько записей журнала имеют id больше заданного (и не больше until_id)."""
+        with self._lock:
+            end = len(self._ids) if until_id is None else bisect.bisect_right(self._ids, until_id)
+            return max(0, end - bisect.bisect_right(self._ids, qso_id))
+
+    def last_id(self):
+        """id последней записи журнала (0 — журнал пуст)."""
+        with self._lock:
+            return self._ids[-1] if self._ids else 0
+
+    def iter_items(self, batch_size=1000, after_id=0, until_id=None):
+        """Генератор пар (id, запись) в порядке журнала, читает базу порциями.
+        after_id/until_id — только записи с after_id < id <= until_id.
+        Каждая порция читается под блокировкой отдельным запросом, поэтому
+        журнал можно менять, пока другой поток перебирает записи."""
+        last_id = after_id
+        upper = until_id if until_id is not None else -1
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT id, {_COLUMNS} FROM qso WHERE id > ? AND (? < 0 OR id <= ?) ORDER BY id LIMIT ?",
+                    (last_id, upper, upper, batch_size)).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                yield row[0], self._to_record(row[1:])
+            last_id = rows[-1][0]
+
+    def iter_qsos(self, batch_size=1000, after_id=0, until_id=None):
+        """Генератор записей журнала (QSORecord) в порядке добавления."""
+        for _, qso in self.iter_items(batch_size, after_id, until_id):
+            yield qso
+
+    def find(self, **criteria):
+        """Поиск по индексированным полям: find(call='R1OAZ', band='40m')."""
+        for name in criteria:
+            if name not in INDEXED_FIELDS:
+                raise ValueError(f"Поиск по полю '{name}' не поддерживается")
+        if isinstance(criteria.get('datetime'), str):
+            criteria['datetime'] = parse_datetime(criteria['datetime'])
+        where = " AND ".join(f"{name} = ?" for name in criteria) or "1"
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {_COLUMNS} FROM qso WHERE {where} ORDER BY id",
+                                     tuple(criteria.values())).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def close(self):
+        try:
+            with self._lock:
+                self.conn.close()
+        except Exception as e:
+            logging.error(f"Ошибка закрытия базы журнала: {e}")
@@ -0,0 +1,121 @@
+"""
+Super Check Partial: поиск позывных по фрагменту.
+Позывные из журнала и из файла MASTER.SCP индексируются по n-граммам
+(2 и 3 символа), поэтому поиск по фрагменту сводится к пересечению
+нескольких небольших множеств и укладывается в миллисекунды даже на
+десятках тысяч позывных. Символ '?' во фрагменте означает любой один символ.
+"""
+import logging
+import re
+
+# Минимальная длина фрагмента, по которому выполняется поиск
+MIN_QUERY_LENGTH = 2
+# Сколько совпадений возвращать по умолчанию
+DEFAULT_LIMIT = 20
+
+_GRAM_SIZES = (2, 3)
+
+
+def _grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def load_master_file(path):
+    """Читает позывные из файла формата MASTER.SCP (строки с '#' — комментарии)."""
+    calls = []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                call = line.strip().upper()
+                if call and not call.startswith('#'):
+                    calls.append(call)
+    except Exception as e:
+        logging.error(f"Ошибка чтения файла позывных {path}: {e}")
+    return calls
+
+
+class PartialCallIndex:
+    def __init__(self):
+        self._postings = {}        # n-грамма -> множество позывных
+        self._journal_counts = {}  # позывной из журнала -> число записей
+        self._master = set()       # позывные из файла MASTER.SCP
+
+    def __len__(self):
+        return len(self._master) + sum(1 for call in self._journal_counts if call not in self._master)
+
+    def _index(self, call):
+        for size in _GRAM_SIZES:
+            for gram in _grams(call, size):
+                self._postings.setdefault(gram, set()).add(call)
+
+    def _unindex(self, call):
+        for size in _GRAM_SIZES:
+            for gram in _grams(call, size):
+                calls = self._postings.get(gram)
+                if calls is not None:
+                    calls.discard(call)
+                    if not calls:
+                        del self._postings[gram]
+
+    def _known(self, call):
+        return call in self._master or call in self._journal_counts
+
+    def add_journal_call(self, call):
+        call = call.strip().upper()
+        if not call:
+            return
+        if not self._known(call):
+            self._index(call)
+        self._journal_counts[call] = self._journal_counts.get(call, 0) + 1
+
+    def remove_journal_call(self, call):
+        call = call.strip().upper()
+        count = self._journal_counts.get(call, 0)
+        if count > 1:
+            self._journal_counts[call] = count - 1
+            return
+        self._journal_counts.pop(call, None)
+        if count and call not in self._master:
+            self._unindex(call)
+
+    def set_master_calls(self, calls):
+        """Заменяет список позывных MASTER.SCP; позывные журнала сохраняются."""
+        new_master = {call.strip().upper() for call in calls if call and call.strip()}
+        for call in self._master - new_master:
+            if call not in self._journal_counts:
+                self._unindex(call)
+        for call in new_master - self._master:
+            if call not in self._journal_counts:
+                self._index(call)
+        self._master = new_master
+
+    def search(self, fragment, limit=DEFAULT_LIMIT):
+        """Позывные, содержащие фрагмент; сначала из журнала, затем из MASTER.SCP."""
+        fragment = fragment.strip().upper()
+        pieces = [piece for piece in fragment.split('?') if piece]
+        if len(fragment) < MIN_QUERY_LENGTH or not any(len(p) >= MIN_QUERY_LENGTH for p in pieces):
+            return []
+        # Кандидаты — пересечение списков n-грамм всех кусков фрагмента
+        postings = []
+        for piece in pieces:
+            size = 3 if len(piece) >= 3 else 2
+            if len(piece) < size:
+                continue
+            for gram in _grams(piece, size):
+                calls = self._postings.get(gram)
+                if not calls:
+                    return []
+                postings.append(calls)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for calls in postings[1:]:
+            candidates &= calls
+            if not candidates:
+                return []
+        if '?' in fragment:
+            pattern = re.compile('.'.join(re.escape(part) for part in fragment.split('?')))
+            matches = [call for call in candidates if pattern.search(call)]
+        else:
+            matches = [call for call in candidates if fragment in call]
+        matches.sort(key=lambda call: (call not in self._journal_counts, call))
+        return matches[:limit]
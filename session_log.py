@@ -0,0 +1,209 @@
+"""
+Журнал операций сеанса (temp) для автосохранения.
+Каждое добавление, изменение и удаление QSO дописывается в файл одной
+строкой JSON, поэтому стоимость автосохранения не зависит от размера журнала.
+Когда операций накапливается больше, чем живых записей, файл в фоновом
+потоке сжимается до снимка текущего состояния.
+Операция 'mark' запоминает id последней экспортированной записи (отметку
+экспорта), чтобы после восстановления сеанса экспорт новых QSO продолжился
+с того же места.
+"""
+import json
+import logging
+import os
+import threading
+
+# Минимальное число операций между сжатиями файла
+DEFAULT_COMPACT_THRESHOLD = 1000
+
+
+def _dump(entry):
+    return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+def _iter_ops(lines):
+    """Операции (op, id, запись или None) из строк журнала операций."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+            op = entry['op']
+            qso_id = entry['id']
+        except (ValueError, KeyError, TypeError):
+            # Оборванная при сбое последняя строка и прочий мусор пропускаются
+            continue
+        yield op, qso_id, entry.get('qso')
+
+
+def _fold(lines):
+    """Проигрывает строки журнала операций и возвращает ({id: запись} в порядке журнала, отметку экспорта)."""
+    records = {}
+    mark = 0
+    for op, qso_id, qso in _iter_ops(lines):
+        if op in ('add', 'edit'):
+            records[qso_id] = qso or {}
+        elif op == 'del':
+            records.pop(qso_id, None)
+        elif op == 'mark':
+            mark = qso_id
+    return records, mark
+
+
+def _snapshot_lines(items, mark):
+    for qso_id, qso in items:
+        yield _dump({'op': 'add', 'id': qso_id, 'qso': qso})
+    if mark:
+        yield _dump({'op': 'mark', 'id': mark})
+
+
+class SessionLog:
+    def __init__(self, path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._file = None
+        self._live = 0  # число живых записей (оценка для решения о сжатии)
+        self._ops_since_compact = 0
+        self._compacting = False
+        self._generation = 0  # меняется при замене или удалении файла
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def append(self, op, qso_id, qso=None):
+        """Дописывает одну операцию ('add', 'edit', 'del' или 'mark') в конец файла."""
+        self.append_many([(op, qso_id, qso)])
+
+    def append_many(self, operations, sync=False):
+        """Дописывает пачку операций (op, id, запись) одной записью в файл.
+        sync=True дополнительно сбрасывает файл на диск (fsync)."""
+        operations = list(operations)
+        lines = []
+        for op, qso_id, qso in operations:
+            entry = {'op': op, 'id': qso_id}
+            if qso is not None:
+                entry['qso'] = qso
+            lines.append(_dump(entry))
+        if not lines:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(''.join(lines))
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            self._ops_since_compact += len(lines)
+            for op, _, _ in operations:
+                if op == 'add':
+                    self._live += 1
+                elif op == 'del':
+                    self._live = max(0, self._live - 1)
+            need_compact = (not self._compacting and
+                            self._ops_since_compact > max(self.compact_threshold, self._live))
+            if need_compact:
+                self._compacting = True
+        if need_compact:
+            threading.Thread(target=self._compact, name="SessionLogCompact", daemon=True).start()
+
+    def write_snapshot(self, items, mark=0):
+        """Атомарно заменяет файл снимком журнала; items — пары (id, запись),
+        mark — id последней экспортированной записи."""
+        tmp_path = self.path + '.tmp'
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for line in _snapshot_lines(items, mark):
+                f.write(line)
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self._close_file()
+            os.replace(tmp_path, self.path)
+            self._generation += 1
+            self._live = count
+            self._ops_since_compact = 0
+
+    def _open_for_reading(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        return open(self.path, 'r', encoding='utf-8')
+
+    def record_count(self):
+        """Число записей в файле (0, если файла нет); в памяти собираются только их id."""
+        if not self.exists():
+            return 0
+        live = set()
+        with self._open_for_reading() as f:
+            for op, qso_id, _ in _iter_ops(f):
+                if op in ('add', 'edit'):
+                    live.add(qso_id)
+                elif op == 'del':
+                    live.discard(qso_id)
+        return len(live)
+
+    def replay(self):
+        """Генератор операций (op, id, запись) из файла по порядку — восстановление сеанса
+        проигрывает их прямо в хранилище, не собирая журнал в памяти."""
+        if not self.exists():
+            return
+        with self._open_for_reading() as f:
+            yield from _iter_ops(f)
+
+    def _compact(self):
+        tmp_path = self.path + '.compact'
+        try:
+            with self._lock:
+                if self._file is not None:
+                    self._file.flush()
+                if not self.exists():
+                    return
+                offset = os.path.getsize(self.path)
+                generation = self._generation
+            # Основная работа — без блокировки, добавления продолжают писаться в хвост файла
+            with open(self.path, 'rb') as f:
+                data = f.read(offset)
+            records, mark = _fold(data.decode('utf-8', errors='replace').splitlines())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for line in _snapshot_lines(records.items(), mark):
+                    f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                if generation != self._generation or not self.exists():
+                    # Файл заменили снимком или удалили, пока шло сжатие
+                    os.remove(tmp_path)
+                    return
+                self._close_file()
+                with open(self.path, 'rb') as src, open(tmp_path, 'ab') as dst:
+                    src.seek(offset)
+                    tail = src.read()
+                    tail_ops = tail.count(b"\n")
+                    dst.write(tail)
+                os.replace(tmp_path, self.path)
+                self._live = len(records)
+                self._ops_since_compact = tail_ops
+        except Exception as e:
+            logging.error(f"Ошибка сжатия temp-журнала: {e}")
+        finally:
+            self._compacting = False
+
+    def clear(self):
+        with self._lock:
+            self._close_file()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._generation += 1
+            self._live = 0
+            self._ops_since_compact = 0
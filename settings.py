@@ -20,9 +20,28 @@ class SettingsManager:
             'qrz_username': '',
             'qrz_password': '',
             'use_qrz_lookup': '0',  # По умолчанию все флажки сняты
+            'qrz_cache_ttl_hours': '720',  # сколько хранить найденные на QRZ.ru данные
+            'qrz_cache_negative_ttl_hours': '24',  # сколько помнить, что позывной не найден
+            'qrz_cache_max_entries': '50000',  # размер кэша, позывных
+            'qrz_connect_timeout': '5',  # таймаут соединения с QRZ.ru, с
+            'qrz_read_timeout': '10',  # таймаут ожидания ответа QRZ.ru, с
+            'qrz_prefetch': '0',  # искать позывной на QRZ.ru заранее, во время набора
+            'lookup_chain': 'memory,disk,journal,qrz',  # источники данных о позывном по порядку
+            'qrz_lookup_timeout': '15',  # сколько ждать ответа QRZ.ru в цепочке поиска, с
+            'qrz_api_url': 'https://api.qrz.ru/',  # адрес XML API QRZ.ru
+            'qrz_bulk_workers': '4',  # параллельных запросов при заполнении журнала из QRZ.ru
+            'qrz_bulk_rate': '5',  # не больше запросов к QRZ.ru в секунду при заполнении журнала
             'check_updates_on_start': '0',
             'auto_temp': '0',  # автосохранение сессии
+            'autosave_delay_ms': '1000',  # окно объединения изменений для автосохранения
+            'use_scp': '0',  # подсказка позывных по фрагменту (Super Check Partial)
+            'scp_file': '',  # путь к файлу MASTER.SCP
+            'cty_file': '',  # путь к файлу стран cty.dat (по умолчанию cty.dat рядом с программой)
             'log_enabled': '0',
+            # дополнительные форматы, сохраняемые вместе с ADIF за тот же проход по журналу
+            'export_adx': '0',
+            'export_csv': '0',
+            'export_cabrillo': '0',
         }
         # Visible fields defaults (1 = visible, 0 = hidden). CALL always visible.
         self.visible_field_names = [
@@ -169,6 +188,8 @@ class SettingsDialog(wx.Dialog):
         self.qrz_sizer.Add(self.qrz_password_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
         self.qrz_sizer.Add(self.qrz_password_text, 1, wx.EXPAND)
         gen_sizer.Add(self.qrz_sizer, 0, wx.EXPAND | wx.ALL, 5)
+        self.qrz_prefetch_checkbox = wx.CheckBox(general_panel, label="Искать позывной на QRZ.ru заранее, во время набора")
+        gen_sizer.Add(self.qrz_prefetch_checkbox, 0, wx.ALL, 5)
         self.timezone_label = wx.StaticText(general_panel, label="Часовой пояс:")
         self.timezone_choice = wx.RadioBox(
             general_panel, label="", choices=["UTC", "Задать свой часовой пояс"], majorDimension=1, style=wx.RA_SPECIFY_ROWS
@@ -181,6 +202,19 @@ class SettingsDialog(wx.Dialog):
         gen_sizer.Add(self.check_updates_checkbox, 0, wx.ALL, 5)
         self.auto_temp_checkbox = wx.CheckBox(general_panel, label="Автосохранение сеанса (temp)")
         gen_sizer.Add(self.auto_temp_checkbox, 0, wx.ALL, 5)
+        self.use_scp_checkbox = wx.CheckBox(general_panel, label="Подсказывать позывные по фрагменту (Super Check Partial)")
+        gen_sizer.Add(self.use_scp_checkbox, 0, wx.ALL, 5)
+        self.export_format_checkboxes = {}
+        for key, label in (('export_adx', "Вместе с ADIF сохранять ADX (XML)"),
+                           ('export_csv', "Вместе с ADIF сохранять CSV"),
+                           ('export_cabrillo', "Вместе с ADIF сохранять Cabrillo")):
+            cb = wx.CheckBox(general_panel, label=label)
+            gen_sizer.Add(cb, 0, wx.ALL, 5)
+            self.export_format_checkboxes[key] = cb
+        self.scp_file_label = wx.StaticText(general_panel, label="Файл позывных MASTER.SCP:")
+        self.scp_file_text = wx.TextCtrl(general_panel)
+        self.cty_file_label = wx.StaticText(general_panel, label="Файл стран cty.dat:")
+        self.cty_file_text = wx.TextCtrl(general_panel)
         fields = [
             (self.call_label, self.call_text),
             (self.operator_name_label, self.operator_name_text),
@@ -190,7 +224,9 @@ class SettingsDialog(wx.Dialog):
             (self.my_lat_label, self.my_lat_text),
             (self.my_lon_label, self.my_lon_text),
             (self.timezone_label, self.timezone_choice),
-            (self.custom_timezone_label, self.custom_timezone_text)
+            (self.custom_timezone_label, self.custom_timezone_text),
+            (self.scp_file_label, self.scp_file_text),
+            (self.cty_file_label, self.cty_file_text),
         ]
         for label, ctrl in fields:
             row_sizer = wx.BoxSizer(wx.HORIZONTAL)
@@ -268,6 +304,7 @@ class SettingsDialog(wx.Dialog):
         self.qrz_username_text.Enable(enabled)
         self.qrz_password_label.Enable(enabled)
         self.qrz_password_text.Enable(enabled)
+        self.qrz_prefetch_checkbox.Enable(enabled)
 
     def load_settings(self):
         self.call_text.SetValue(self.settings['call'])
@@ -283,9 +320,15 @@ class SettingsDialog(wx.Dialog):
         self.custom_timezone_text.SetValue(self.settings['custom_timezone'])
         self.custom_timezone_text.Enable(self.settings['timezone'] == "Задать свой часовой пояс")
         self.use_qrz_checkbox.SetValue(self.settings.get('use_qrz_lookup', '0') == '1')
+        self.qrz_prefetch_checkbox.SetValue(self.settings.get('qrz_prefetch', '0') == '1')
         self.log_enabled_checkbox.SetValue(self.settings.get('log_enabled', '0') == '1')
         self.check_updates_checkbox.SetValue(self.settings.get('check_updates_on_start', '0') == '1')
         self.auto_temp_checkbox.SetValue(self.settings.get('auto_temp', '0') == '1')
+        self.use_scp_checkbox.SetValue(self.settings.get('use_scp', '0') == '1')
+        self.scp_file_text.SetValue(self.settings.get('scp_file', ''))
+        self.cty_file_text.SetValue(self.settings.get('cty_file', ''))
+        for key, cb in self.export_format_checkboxes.items():
+            cb.SetValue(self.settings.get(key, '0') == '1')
         self.on_use_qrz_toggle(None)
 
         # Устанавливаем состояния чекбоксов видимости полей
@@ -312,10 +355,17 @@ class SettingsDialog(wx.Dialog):
             'timezone': self.timezone_choice.GetStringSelection(),
             'custom_timezone': self.custom_timezone_text.GetValue(),
             'use_qrz_lookup': '1' if self.use_qrz_checkbox.GetValue() else '0',
+            'qrz_prefetch': '1' if self.qrz_prefetch_checkbox.GetValue() else '0',
             'log_enabled': '1' if self.log_enabled_checkbox.GetValue() else '0',
             'check_updates_on_start': '1' if self.check_updates_checkbox.GetValue() else '0',
             'auto_temp': '1' if self.auto_temp_checkbox.GetValue() else '0',
+            'use_scp': '1' if self.use_scp_checkbox.GetValue() else '0',
+            'scp_file': self.scp_file_text.GetValue(),
+            'cty_file': self.cty_file_text.GetValue(),
         }
+        for key, cb in self.export_format_checkboxes.items():
+            settings[key] = '1' if cb.GetValue() else '0'
+
         self.settings_manager.save_settings(settings)
         # Сохраняем видимость полей
         for fname, cb in getattr(self, 'visible_checkboxes', {}).items():
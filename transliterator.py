@@ -1,13 +1,37 @@
 """
 Модуль для транслитерации русского текста в латиницу.
-Использует библиотеку transliterate для преобразования кириллицы в латиницу.
+Таблица для str.translate собирается один раз при импорте и даёт тот же
+результат, что transliterate.translit(text, 'ru', reversed=True), которой
+программа пользовалась раньше (проверка — bench_transliterator.py).
+Латинский текст возвращается без изменений сразу, результаты для кириллицы
+запоминаются (имена и города повторяются из QSO в QSO).
 """
+from functools import lru_cache
+
+# Сколько разных строк с кириллицей помнить
+MEMO_SIZE = 4096
+
+# Буква -> латиница (правила пакета transliterate для русского языка, обратное направление)
+RUSSIAN_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh',
+    'з': 'z', 'и': 'i', 'й': 'j', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': "'", 'ы': 'y', 'ь': "'", 'э': 'e', 'ю': 'ju',
+    'я': 'ja',
+    'А': 'A', 'Б': 'B', 'В': 'V', 'Г': 'G', 'Д': 'D', 'Е': 'E', 'Ё': 'E', 'Ж': 'Zh',
+    'З': 'Z', 'И': 'I', 'Й': 'J', 'К': 'K', 'Л': 'L', 'М': 'M', 'Н': 'N', 'О': 'O',
+    'П': 'P', 'Р': 'R', 'С': 'S', 'Т': 'T', 'У': 'U', 'Ф': 'F', 'Х': 'H', 'Ц': 'Ts',
+    'Ч': 'Ch', 'Ш': 'Sh', 'Щ': 'Sch', 'Ъ': "'", 'Ы': 'Y', 'Ь': "'", 'Э': 'E', 'Ю': 'Ju',
+    'Я': 'Ja',
+}
+
+_TABLE = str.maketrans(RUSSIAN_TO_LATIN)
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _translit(text):
+    return text.translate(_TABLE)
 
-try:
-    import transliterate
-    import transliterate.contrib.languages.ru
-except ImportError:
-    raise ImportError("Библиотека 'transliterate' не установлена. Установите её командой: pip install transliterate")
 
 def transliterate_russian(text):
     """
@@ -17,14 +41,25 @@ def transliterate_russian(text):
     :param text: Строка для транслитерации
     :return: Транслитерированная строка или оригинал
     """
-    if not text:
+    if not text or text.isascii():
         return text
-    # Проверяем на наличие кириллических символов (базовая проверка)
-    if any(ord(char) > 127 and char.isalpha() for char in text):
-        try:
-            return transliterate.translit(text, 'ru', reversed=True)
-        except Exception as e:
-            # В случае ошибки транслитерации возвращаем оригинал
-            print(f"Ошибка транслитерации: {e}")
-            return text
-    return text
\ No newline at end of file
+    return _translit(text)
+
+
+def transliterate_many(values):
+    """Транслитерация столбца значений при массовом заполнении журнала данными поиска;
+    одинаковые значения преобразуются один раз. Возвращает список.
+    Экспорт её не использует: там транслитерируется только то, чего нет в кодировке
+    файла (adif_schema.fit_value), и в UTF-8 кириллица сохраняется как есть."""
+    done = {}
+    result = []
+    append = result.append
+    for value in values:
+        if not value or value.isascii():
+            append(value)
+            continue
+        converted = done.get(value)
+        if converted is None:
+            converted = done[value] = value.translate(_TABLE)
+        append(converted)
+    return result